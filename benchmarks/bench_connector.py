@@ -0,0 +1,195 @@
+# File: bench_connector.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Benchmark of the 'run query', 'get config' and 'on poll' actions against the local stand-in server.
+
+Every action is driven through the connector's _handle_action entry point, like the platform does, and reports the
+wall time, the peak Python memory and the number of requests the stand-in served. Run it with the interpreter of the
+SOAR instance (or any environment where the phantom package is importable), from the root of the app:
+
+    python benchmarks/bench_connector.py --sizes 1000 10000 100000
+
+The stand-in runs in a separate process, so its own allocations are not part of the measured peak memory.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import phantom.app as phantom
+import requests
+from stand_in_server import start_server
+
+from elasticsearch_connector import ElasticsearchConnector
+
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+PAGE_SIZE = 1000
+
+
+class BenchConnector(ElasticsearchConnector):
+    """The connector with the platform side replaced: state is kept in memory and containers are counted, not saved"""
+
+    def __init__(self, state_dir):
+        super().__init__()
+        self._bench_state_dir = state_dir
+        self.containers_saved = 0
+
+    def get_state_dir(self):
+        return self._bench_state_dir
+
+    def load_state(self):
+        return {}
+
+    def save_state(self, state):
+        pass
+
+    def is_poll_now(self):
+        return False
+
+    def save_containers(self, containers):
+        self.containers_saved += len(containers)
+        return phantom.APP_SUCCESS, "", [{"success": True, "id": self.containers_saved} for _ in containers]
+
+    def save_container(self, container):
+        self.containers_saved += 1
+        return phantom.APP_SUCCESS, "", self.containers_saved
+
+
+def _serve(hits, connection):
+    server = start_server(hits, indices=hits)
+    connection.send(server.server_port)
+    connection.recv()
+    server.shutdown()
+
+
+def _scenarios(size):
+    """(name, action identifier, extra asset config, action parameters) of every benchmarked action"""
+
+    return [
+        ("run query", "run_query", {}, {"index": "bench", "query": "{}", "paginate": True, "page_size": PAGE_SIZE, "max_hits": size}),
+        ("get config", "get_config", {}, {}),
+        (
+            "on poll",
+            "on_poll",
+            {
+                "ingest_index": "bench",
+                "ingest_query": "{}",
+                "ingest_timestamp_field": "@timestamp",
+                "ingest_tiebreaker_field": "uid",
+                "ingest_page_size": PAGE_SIZE,
+            },
+            {},
+        ),
+        (
+            "on poll grouped",
+            "on_poll",
+            {
+                "ingest_index": "bench",
+                "ingest_query": "{}",
+                "ingest_timestamp_field": "@timestamp",
+                "ingest_tiebreaker_field": "uid",
+                "ingest_page_size": PAGE_SIZE,
+                "ingest_group_by": "host.name",
+                "ingest_group_bucket": 3600,
+            },
+            {},
+        ),
+    ]
+
+
+def run_action(base_url, identifier, config, param):
+    """Run one action, returns (succeeded, wall seconds, peak bytes, connector)"""
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        connector = BenchConnector(state_dir)
+        in_json = {
+            "action": identifier,
+            "identifier": identifier,
+            "asset_id": "bench",
+            "config": dict({"url": base_url, "verify_server_cert": False}, **config),
+            "parameters": [param],
+        }
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        connector._handle_action(json.dumps(in_json), None)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    succeeded = all(phantom.is_success(action_result.get_status()) for action_result in connector.get_action_results())
+    return succeeded, elapsed, peak, connector
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="number of hits (and indices) served")
+    argparser.add_argument("--actions", nargs="+", help="only run these actions, e.g. 'run query'")
+    argparser.add_argument("--json", action="store_true", help="print the results as JSON lines")
+    args = argparser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        parent, child = multiprocessing.Pipe()
+        server = multiprocessing.Process(target=_serve, args=(size, child), daemon=True)
+        server.start()
+        base_url = f"http://127.0.0.1:{parent.recv()}"
+        stats_url = f"{base_url}/_bench/stats"
+
+        try:
+            for name, identifier, config, param in _scenarios(size):
+                if args.actions and name not in args.actions:
+                    continue
+
+                requests.delete(stats_url, timeout=10)
+                succeeded, elapsed, peak, connector = run_action(base_url, identifier, config, param)
+                served = requests.get(stats_url, timeout=10).json()
+
+                result = {
+                    "action": name,
+                    "size": size,
+                    "succeeded": succeeded,
+                    "seconds": round(elapsed, 3),
+                    "peak_mib": round(peak / 1048576, 1),
+                    "requests": sum(served.values()),
+                }
+                if identifier == "on_poll":
+                    result["containers"] = connector.containers_saved
+                results.append(result)
+
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    line = "{action:<16} {size:>8} hits  {seconds:>8.3f} s  {peak_mib:>8.1f} MiB  {requests:>5} requests".format(**result)
+                    if "containers" in result:
+                        line += "  {containers:>6} containers".format(**result)
+                    print(line + ("  ok" if succeeded else "  FAILED"))
+        finally:
+            parent.send(None)
+            server.join()
+
+    return 0 if all(result["succeeded"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
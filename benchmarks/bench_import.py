@@ -0,0 +1,95 @@
+# File: bench_import.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Cold start benchmark of the connector module, fails when importing it exceeds the budget.
+
+Every action runs in a new process which starts by importing elasticsearch_connector, so the import time is paid by
+every 'test connectivity' and 'run query'. The import is timed with -X importtime in fresh interpreters, and the
+modules which are meant to be imported lazily must not be loaded by it. Run it from the root of the app with the
+interpreter of the SOAR instance:
+
+    python benchmarks/bench_import.py --budget-ms 250
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = "elasticsearch_connector"
+
+# only needed by some actions or error paths, importing any of them at load time is a regression
+LAZY_MODULES = ["bs4", "gzip", "uuid", "concurrent.futures", "phantom.rules", "phantom.vault"]
+
+DEFAULT_RUNS = 7
+DEFAULT_BUDGET_MS = 250
+
+
+def _run_python(*args):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [APP_DIR, env.get("PYTHONPATH")]))
+    return subprocess.run([sys.executable, *args], cwd=APP_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def import_time_ms():
+    """Cumulative import time of the connector module in a fresh interpreter, in milliseconds"""
+
+    result = _run_python("-X", "importtime", "-c", f"import {MODULE}")
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == MODULE:
+            return int(parts[1]) / 1000
+
+    raise RuntimeError(f"No import time reported for {MODULE}:\n{result.stderr[-2000:]}")
+
+
+def eagerly_loaded():
+    """The lazy modules which importing the connector loads anyway"""
+
+    code = f"import json, sys; import {MODULE}; print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+    return json.loads(_run_python("-c", code).stdout)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="number of fresh interpreters to time")
+    argparser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="maximum median import time")
+    args = argparser.parse_args()
+
+    # the first run compiles and caches the bytecode, it is not a cold start the platform sees
+    import_time_ms()
+    timings = [import_time_ms() for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"import {MODULE}: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms over {args.runs} runs")
+
+    failed = False
+    if median > args.budget_ms:
+        print(f"FAILED: the median import time is over the budget of {args.budget_ms:.0f} ms")
+        failed = True
+
+    loaded = eagerly_loaded()
+    if loaded:
+        print(f"FAILED: modules meant to be imported on first use are loaded at import time: {', '.join(loaded)}")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
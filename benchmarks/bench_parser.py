@@ -0,0 +1,176 @@
+# File: bench_parser.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Benchmark of the default ingest parser and its field maps against the previous parser and a per-hit custom parser.
+
+The parsers get the same synthetic pages of hits as the stand-in server serves, everything they print is discarded.
+Run it from the root of the app:
+
+    python benchmarks/bench_parser.py --hits 100000 --page-size 1000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stand_in_server import make_hit
+
+import elasticsearch_parser
+from elasticsearch_fields import compile_field_map
+
+
+DEFAULT_HITS = 100000
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_RUNS = 3
+
+FIELD_MAP = {
+    "fields": {
+        "@timestamp": {"cef": "startTime", "type": "timestamp"},
+        "event.id": {"cef": "eventId", "type": "integer"},
+        "event.action": "act",
+        "event.outcome": "outcome",
+        "source.ip": {"cef": "sourceAddress", "contains": ["ip"]},
+        "source.port": {"cef": "sourcePort", "type": "integer", "contains": ["port"]},
+        "destination.ip": {"cef": "destinationAddress", "contains": ["ip"]},
+        "destination.port": {"cef": "destinationPort", "type": "integer", "contains": ["port"]},
+        "host.name": {"cef": "deviceHostname", "contains": ["host name"]},
+        "message": "msg",
+        "_index": "deviceCustomString1",
+    },
+    "keep_unmapped": False,
+}
+
+
+def previous_parser(data):
+    """The default parser before the field map, the nested _source is the CEF as is"""
+
+    results = []
+    for hit in data.get("hits", {}).get("hits", []):
+        print("Found hit {}. Building container".format(hit["_id"]))
+        container = {
+            "run_automation": False,
+            "source_data_identifier": hit["_id"],
+            "name": "Elasticsearch: {} {}".format(hit["_index"], hit["_id"]),
+        }
+        artifact = {
+            "run_automation": True,
+            "label": "event",
+            "name": "elasticsearch event",
+            "cef": hit.get("_source"),
+            "source_data_identifier": hit["_id"],
+        }
+        results.append({"container": container, "artifacts": [artifact]})
+    return results
+
+
+def custom_parser(data):
+    """A custom parser which maps the same fields as FIELD_MAP, interpreting the map for every hit"""
+
+    def lookup(source, path):
+        for key in path.split("."):
+            if not isinstance(source, dict) or key not in source:
+                return None
+            source = source[key]
+        return source
+
+    results = []
+    for hit in data.get("hits", {}).get("hits", []):
+        print("Found hit {}. Building container".format(hit["_id"]))
+        cef = {}
+        cef_types = {}
+        for path, target in FIELD_MAP["fields"].items():
+            target = target if isinstance(target, dict) else {"cef": target}
+            value = hit.get(path) if path.startswith("_") else lookup(hit.get("_source", {}), path)
+            if value is None:
+                continue
+            if target.get("type") == "integer":
+                value = int(value)
+            elif target.get("type") == "timestamp":
+                value = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(value / 1000)) + f".{value % 1000:03d}Z"
+            cef[target["cef"]] = value
+            if target.get("contains"):
+                cef_types[target["cef"]] = target["contains"]
+        container = {
+            "run_automation": False,
+            "source_data_identifier": hit["_id"],
+            "name": "Elasticsearch: {} {}".format(hit["_index"], hit["_id"]),
+        }
+        artifact = {
+            "run_automation": True,
+            "label": "event",
+            "name": "elasticsearch event",
+            "cef": cef,
+            "cef_types": cef_types,
+            "source_data_identifier": hit["_id"],
+        }
+        results.append({"container": container, "artifacts": [artifact]})
+    return results
+
+
+def _pages(hits, page_size):
+    return [
+        {"hits": {"hits": [make_hit("bench", position) for position in range(start, min(start + page_size, hits))]}}
+        for start in range(0, hits, page_size)
+    ]
+
+
+def _time(parser, pages, runs):
+    """Best wall time of parsing all the pages, over runs"""
+
+    best = None
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for page in pages:
+                parser(page)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--hits", type=int, default=DEFAULT_HITS, help="number of hits parsed")
+    argparser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="number of hits per page")
+    argparser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="number of runs, the best one is reported")
+    args = argparser.parse_args()
+
+    pages = _pages(args.hits, args.page_size)
+    # the field map is compiled once per poll, like the connector does
+    field_map = compile_field_map(FIELD_MAP)
+    # a map without fields keeps every field, flattened under its dotted path
+    flatten_map = compile_field_map({"fields": {}})
+
+    parsers = [
+        ("previous default (nested cef)", previous_parser),
+        ("custom parser (per-hit map)", custom_parser),
+        ("default (nested cef)", elasticsearch_parser.ingest_parser),
+        ("default, flattening map", lambda page: elasticsearch_parser.ingest_parser(page, field_map=flatten_map)),
+        ("default with field map", lambda page: elasticsearch_parser.ingest_parser(page, field_map=field_map)),
+    ]
+    for name, parser in parsers:
+        elapsed = _time(parser, pages, args.runs)
+        print(f"{name:<30} {args.hits:>8} hits  {elapsed:>8.3f} s  {args.hits / elapsed:>10.0f} hits/s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
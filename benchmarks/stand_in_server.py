@@ -0,0 +1,181 @@
+# File: stand_in_server.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Local HTTP stand-in for the Elasticsearch endpoints the connector calls, serving synthetic hits.
+
+The server answers /_cluster/health, /_cat/indices, the point in time endpoints and /_search with hits generated on
+the fly, so result sets of any size cost no memory on the server side. search_after is honoured, every hit is sorted
+on [timestamp, position] and the next page starts after the position in the last sort value. The uid keyword field
+of every hit is unique, like the tiebreaker field of a real index.
+
+Requests are counted per endpoint, GET /_bench/stats returns the counters and DELETE /_bench/stats resets them.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+BASE_TIMESTAMP = 1_700_000_000_000
+DEFAULT_SEARCH_SIZE = 10
+
+
+def make_hit(index, position):
+    """The synthetic hit at a position, an ECS style authentication event"""
+
+    timestamp = BASE_TIMESTAMP + position * 1000
+    return {
+        "_index": index,
+        "_id": f"{position:09d}",
+        "_score": None,
+        "_source": {
+            "@timestamp": timestamp,
+            "uid": f"{position:09d}",
+            "event": {"id": position, "action": "logon", "outcome": "success" if position % 7 else "failure"},
+            "source": {"ip": f"10.{position // 65536 % 256}.{position // 256 % 256}.{position % 256}", "port": 1024 + position % 60000},
+            "destination": {"ip": "192.168.1.10", "port": 443},
+            "host": {"name": f"host-{position % 50:02d}"},
+            "message": f"synthetic event {position}",
+        },
+        "sort": [timestamp, position],
+    }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, status=200):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw) if raw.strip() else {}
+
+    def _count(self, key):
+        with self.server.lock:
+            self.server.stats[key] = self.server.stats.get(key, 0) + 1
+
+    def _search(self, body):
+        size = body.get("size", DEFAULT_SEARCH_SIZE)
+        search_after = body.get("search_after")
+        start = search_after[-1] + 1 if search_after else body.get("from", 0)
+        end = min(start + size, self.server.hits)
+
+        response = {
+            "took": 1,
+            "timed_out": False,
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+            "hits": {"max_score": None, "hits": [make_hit(self.server.index, position) for position in range(start, end)]},
+        }
+        if body.get("track_total_hits", True) is not False:
+            response["hits"]["total"] = {"value": self.server.hits, "relation": "eq"}
+        if body.get("pit"):
+            response["pit_id"] = body["pit"]["id"]
+        return response
+
+    def _cat_indices(self):
+        return [
+            {
+                "health": "green" if position % 10 else "yellow",
+                "status": "open",
+                "index": f"{self.server.index}-{position:06d}",
+                "uuid": f"{position:022d}",
+                "pri": "1",
+                "rep": "1",
+                "docs.count": str(position * 100),
+                "docs.deleted": "0",
+                "store.size": str(position * 51200),
+                "pri.store.size": str(position * 25600),
+            }
+            for position in range(self.server.indices)
+        ]
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        path = url.path
+        body = self._read_body()
+
+        if path == "/_bench/stats":
+            if method == "DELETE":
+                with self.server.lock:
+                    self.server.stats.clear()
+            with self.server.lock:
+                return self._send(dict(self.server.stats))
+
+        self._count(f"{method} {path}")
+
+        if path == "/_cluster/health":
+            return self._send({"cluster_name": "stand-in", "status": "green", "number_of_nodes": 1})
+        if path == "/_cat/indices":
+            return self._send(self._cat_indices())
+        if path.endswith("/_pit") and method == "POST":
+            return self._send({"id": "stand-in-pit"})
+        if path == "/_pit" and method == "DELETE":
+            return self._send({"succeeded": True, "num_freed": 1})
+        if path.endswith("/_search"):
+            return self._send(self._search(body))
+        if path.endswith("/_count"):
+            return self._send({"count": self.server.hits})
+
+        self._send({"error": {"type": "stand_in_exception", "reason": f"{method} {path} is not served"}}, 400)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def start_server(hits, indices=0, index="bench", host="127.0.0.1", port=0):
+    """Serve the stand-in on a background thread, returns the server, call shutdown() on it when done"""
+
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.hits = hits
+    server.indices = indices
+    server.index = index
+    server.stats = {}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--hits", type=int, default=10000, help="number of hits every search matches")
+    argparser.add_argument("--indices", type=int, default=100, help="number of rows returned by /_cat/indices")
+    argparser.add_argument("--port", type=int, default=9200)
+    args = argparser.parse_args()
+
+    stand_in = start_server(args.hits, args.indices, port=args.port)
+    print(f"Serving {args.hits} hits on http://127.0.0.1:{stand_in.server_port}, press Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stand_in.shutdown()
@@ -0,0 +1,212 @@
+# File: elasticsearch_cache.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Caches kept in the app state directory, so they survive between action runs"""
+
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+class ResultCache:
+    """Directory backed cache with a time to live and least recently used eviction.
+
+    Every entry is a JSON file of its own, named after its key. A lookup reads that file only and never writes it,
+    the age of an entry is the modification time of its file and its last use is the access time, which a hit sets
+    explicitly since the file system may not. Entries are written atomically as they are set, so concurrent action
+    runs share the cache without overwriting each other's entries.
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(self, directory, ttl, max_entries, max_entry_bytes=None):
+        self._directory = directory
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._max_entry_bytes = max_entry_bytes
+
+    @staticmethod
+    def make_key(*parts):
+        """Hash the canonical JSON form of the parts, so equal queries map to the same key whatever their key order"""
+
+        canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + self.SUFFIX)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            # another action run evicted it first
+            pass
+
+    def get(self, key):
+        """Return the cached value, or None if it is missing or expired"""
+
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self._ttl:
+                self._remove(path)
+                return None
+            with open(path, encoding="utf-8") as entry_file:
+                value = json.load(entry_file)
+            os.utime(path, (time.time(), stat.st_mtime))
+        except (OSError, ValueError):
+            # a missing or corrupt entry is a miss
+            return None
+
+        return value
+
+    def set(self, key, value):
+        """Store the value, evicting the expired and then the least recently used entries beyond max_entries"""
+
+        serialized = json.dumps(value)
+        if self._max_entry_bytes and len(serialized) > self._max_entry_bytes:
+            return False
+
+        os.makedirs(self._directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as entry_file:
+                entry_file.write(serialized)
+            os.replace(tmp_path, self._path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._evict()
+        return True
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self._directory):
+            if not entry.name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self._ttl:
+                self._remove(entry.path)
+            else:
+                entries.append((stat.st_atime, entry.path))
+
+        if len(entries) > self._max_entries:
+            entries.sort()
+            for _, path in entries[: len(entries) - self._max_entries]:
+                self._remove(path)
+
+
+class SeenIndex:
+    """Compact on-disk set of recently ingested (index, _id) pairs, rotated by time.
+
+    Every pair is kept as an 8 byte digest in the generation of the time it was added, a generation covers
+    rotation seconds and only the newest generations are kept, so a pair is remembered for at least
+    rotation * (generations - 1) seconds. Digest collisions make a new hit look known with a probability around
+    1e-19 per pair, which is far below anything an ingest will meet. When max_entries is exceeded the oldest
+    generations are dropped early.
+    """
+
+    DIGEST_SIZE = 8
+
+    def __init__(self, path, rotation, generations, max_entries):
+        self._path = path
+        self._rotation = rotation
+        self._generations = generations
+        self._max_entries = max_entries
+        self._digests = None
+        self._dirty = False
+
+    @classmethod
+    def make_key(cls, index, doc_id):
+        return hashlib.blake2b(f"{index}\0{doc_id}".encode(), digest_size=cls.DIGEST_SIZE).digest()
+
+    def _current_generation(self):
+        return int(time.time() // self._rotation)
+
+    def _load(self):
+        if self._digests is not None:
+            return self._digests
+
+        self._digests = {}
+        try:
+            with open(self._path, encoding="utf-8") as index_file:
+                stored = json.load(index_file)
+            if stored.get("rotation") == self._rotation:
+                for generation, packed in stored.get("generations", {}).items():
+                    raw = base64.b64decode(packed)
+                    self._digests[int(generation)] = {raw[i : i + self.DIGEST_SIZE] for i in range(0, len(raw), self.DIGEST_SIZE)}
+        except (OSError, ValueError, AttributeError, TypeError):
+            # a missing, corrupt or differently rotated index starts empty, at worst hits are ingested once more
+            self._digests = {}
+
+        self._expire()
+        return self._digests
+
+    def _expire(self):
+        oldest = self._current_generation() - self._generations + 1
+        for generation in [generation for generation in self._digests if generation < oldest]:
+            del self._digests[generation]
+            self._dirty = True
+
+        while len(self._digests) > 1 and sum(len(digests) for digests in self._digests.values()) > self._max_entries:
+            del self._digests[min(self._digests)]
+            self._dirty = True
+
+    def __contains__(self, key):
+        return any(key in digests for digests in self._load().values())
+
+    def add(self, keys):
+        """Remember the keys in the current generation"""
+
+        digests = self._load()
+        digests.setdefault(self._current_generation(), set()).update(keys)
+        self._dirty = True
+        self._expire()
+
+    def __len__(self):
+        return sum(len(digests) for digests in self._load().values())
+
+    def save(self):
+        """Write the index back atomically, concurrent action runs never see a partial file"""
+
+        if not self._dirty:
+            return
+
+        stored = {
+            "rotation": self._rotation,
+            "generations": {
+                str(generation): base64.b64encode(b"".join(sorted(digests))).decode("ascii") for generation, digests in self._digests.items()
+            },
+        }
+
+        directory = os.path.dirname(self._path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as index_file:
+                json.dump(stored, index_file)
+            os.replace(tmp_path, self._path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._dirty = False
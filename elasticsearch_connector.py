@@ -14,24 +14,47 @@
 # and limitations under the License.
 """Code that implements calls made to the elasticsearch systems device"""
 
-import imp
+# Every action runs in a new process, so the modules only some actions or error paths need (bs4, gzip, the thread
+# pool, the vault and rules APIs) are imported where they are used rather than here. See benchmarks/bench_import.py.
+import collections
+import functools
+import hashlib
+import importlib.util
+import itertools
 import json
+import os
+import queue
+import random
+import re
 import sys
+import threading
+import time
 import urllib.parse as urllib
 
 import phantom.app as phantom
 import requests
-from bs4 import BeautifulSoup
 from phantom.action_result import ActionResult
 from phantom.base_connector import BaseConnector
+from requests.adapters import HTTPAdapter
 
 import elasticsearch_parser
+from elasticsearch_cache import ResultCache, SeenIndex
 from elasticsearch_consts import *
+from elasticsearch_fields import HitGrouper, compile_field_map
+from elasticsearch_nodes import SELECTORS, NodePool, parse_urls, publish_urls
+from elasticsearch_timing import PhaseTimer
+from elasticsearch_windows import TimeWindowPlanner, parse_time
 
 
 MODULE_NAME = "custom_parser"
 HANDLER_NAME = "handle_request"
 
+# compiled custom parser modules, keyed by the sha256 of the parser source
+PARSER_CACHE = {}
+
+# the characters which can follow the part of a number decoded so far, e.g. '.78e10' after the '6' of '6.78e10'
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
 
 class PhantomDebugWriter:
     def __init__(self, this):
@@ -53,6 +76,10 @@ class ElasticsearchConnector(BaseConnector):
     # actions supported by this script
     ACTION_ID_RUN_QUERY = "run_query"
     ACTION_ID_GET_CONFIG = "get_config"
+    ACTION_ID_RUN_MULTI_QUERY = "run_multi_query"
+    ACTION_ID_RUN_AGGREGATION = "run_aggregation"
+    ACTION_ID_EXPORT_QUERY = "export_query"
+    ACTION_ID_INDEX_DOCUMENTS = "index_documents"
     REQUIRED_INGESTION_FIELDS = ["ingest_index", "ingest_query"]
 
     def __init__(self):
@@ -60,10 +87,21 @@ class ElasticsearchConnector(BaseConnector):
 
         self._host = None
         self._base_url = None
+        self._nodes = None
+        self._node_urls = None
         self._headers = None
         self._auth_method = None
         self._username = None
         self._password = None
+        self._session = None
+        self._state = None
+        self._loaded_state = None
+        self._hit_grouper = None
+        self._verbose_debug = False
+        self._retry_settings = None
+        self._retry_budget = 0
+        self._lock = threading.Lock()
+        self._timer = PhaseTimer()
 
         # Call the BaseConnectors init first
         super().__init__()
@@ -73,11 +111,23 @@ class ElasticsearchConnector(BaseConnector):
 
         config = self.get_config()
 
-        # Get the Base URL from the asset config and so some cleanup
-        self._base_url = config[ELASTICSEARCH_JSON_DEVICE_URL].rstrip("/")
+        # Load the state of the app, used to keep the ingestion checkpoints between polls
+        self._state = self.load_state()
+        if not isinstance(self._state, dict):
+            self.debug_print("Resetting the state file with the default format")
+            self._state = {"app_version": self.get_app_json().get("app_version")}
+        # what was loaded, finalize only writes back the keys this action changed
+        self._loaded_state = json.loads(json.dumps(self._state))
 
-        # The host member extracts the host from the URL, is used in creating status messages
-        self._host = self._base_url[self._base_url.find("//") + 2 :]
+        # Get the node URLs from the asset config, a comma separated list, and do some cleanup
+        urls = parse_urls(config[ELASTICSEARCH_JSON_DEVICE_URL])
+        if not urls:
+            return self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_NO_NODE_URL)
+        self._base_url = urls[0]
+        self._node_urls = urls
+
+        # The host member extracts the hosts from the URLs, is used in creating status messages
+        self._host = ", ".join(url[url.find("//") + 2 :] for url in urls)
 
         # The headers, initialize them here once and use them for all other REST calls
         self._headers = {"Accept": "application/json", "Content-Type": "application/json"}
@@ -88,8 +138,207 @@ class ElasticsearchConnector(BaseConnector):
         if self._username and self._password:
             self._auth_method = True
 
+        self._verbose_debug = config.get(ELASTICSEARCH_JSON_VERBOSE_DEBUG, False)
+        self._timer = PhaseTimer(trace=config.get(ELASTICSEARCH_JSON_TIMING_TRACE, False))
+
+        ret_val, pool_size = self._validate_integer(
+            self, config.get(ELASTICSEARCH_JSON_POOL_SIZE, ELASTICSEARCH_DEFAULT_POOL_SIZE), ELASTICSEARCH_JSON_POOL_SIZE
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        self._retry_settings = {}
+        for key, default, allow_zero in (
+            (ELASTICSEARCH_JSON_CONNECT_TIMEOUT, ELASTICSEARCH_DEFAULT_CONNECT_TIMEOUT, False),
+            (ELASTICSEARCH_JSON_READ_TIMEOUT, ELASTICSEARCH_DEFAULT_TIMEOUT, False),
+            (ELASTICSEARCH_JSON_REQUEST_RETRIES, ELASTICSEARCH_DEFAULT_REQUEST_RETRIES, True),
+            (ELASTICSEARCH_JSON_RETRY_BUDGET, ELASTICSEARCH_DEFAULT_RETRY_BUDGET, True),
+            (ELASTICSEARCH_JSON_BREAKER_THRESHOLD, ELASTICSEARCH_DEFAULT_BREAKER_THRESHOLD, True),
+            (ELASTICSEARCH_JSON_BREAKER_COOLDOWN, ELASTICSEARCH_DEFAULT_BREAKER_COOLDOWN, True),
+        ):
+            ret_val, self._retry_settings[key] = self._validate_integer(self, config.get(key, default), key, allow_zero)
+            if phantom.is_fail(ret_val):
+                return self.get_status()
+
+        # the retry budget is shared by all the REST calls of the action
+        self._retry_budget = self._retry_settings[ELASTICSEARCH_JSON_RETRY_BUDGET]
+
+        ret_val, sniff_interval = self._create_node_pool(config, urls)
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        # One pooled session per connector run, so consecutive calls reuse the same TCP/TLS connection
+        self._session = self._create_session(config, pool_size)
+
+        if sniff_interval and time.time() - self._nodes.sniffed_at >= sniff_interval:
+            self._sniff_nodes()
+
+        return phantom.APP_SUCCESS
+
+    def finalize(self):
+        if self._session:
+            connections, requests_made = self._get_connection_stats()
+            self.debug_print(ELASTICSEARCH_CONNECTION_STATS.format(requests=requests_made, connections=connections))
+            self._session.close()
+            self._session = None
+
+        if self._nodes:
+            # dead nodes stay out of the rotation of the next actions until their backoff is over
+            try:
+                self._nodes.save()
+            except Exception as e:
+                self.debug_print(f"Unable to save the health of the nodes: {self._get_error_message_from_exception(e)}")
+
+        self._save_state_changes()
+
         return phantom.APP_SUCCESS
 
+    def _save_state_changes(self):
+        """Merge the top level keys of the state changed by this action into the state saved meanwhile, and save it.
+
+        Several actions of the asset can run at the same time, e.g. a 'run query' during a poll, writing back the
+        whole state loaded at the start would roll back the checkpoint the poll saved in between.
+        """
+
+        if self._state is None:
+            return
+
+        missing = object()
+        changed = [
+            key for key in set(self._state) | set(self._loaded_state) if self._state.get(key, missing) != self._loaded_state.get(key, missing)
+        ]
+        if not changed:
+            return
+
+        state = self.load_state()
+        if not isinstance(state, dict):
+            state = {}
+        for key in changed:
+            if key in self._state:
+                state[key] = self._state[key]
+            else:
+                state.pop(key, None)
+        self.save_state(state)
+
+    def _create_node_pool(self, config, urls):
+        """Build the pool of the nodes the REST calls are spread over, with their health saved by the previous actions.
+        Returns the sniffing interval, 0 when only the configured URLs are used."""
+
+        selector = config.get(ELASTICSEARCH_JSON_NODE_SELECTOR, SELECTORS[0])
+        if selector not in SELECTORS:
+            return RetVal(
+                self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_VALUE_LIST.format(key=ELASTICSEARCH_JSON_NODE_SELECTOR, values=SELECTORS))
+            )
+
+        ret_val, dead_timeout = self._validate_integer(
+            self,
+            config.get(ELASTICSEARCH_JSON_DEAD_NODE_TIMEOUT, ELASTICSEARCH_DEFAULT_DEAD_NODE_TIMEOUT),
+            ELASTICSEARCH_JSON_DEAD_NODE_TIMEOUT,
+            True,
+        )
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        ret_val, sniff_interval = self._validate_integer(
+            self, config.get(ELASTICSEARCH_JSON_SNIFF_INTERVAL, ELASTICSEARCH_DEFAULT_SNIFF_INTERVAL), ELASTICSEARCH_JSON_SNIFF_INTERVAL, True
+        )
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val)
+
+        # the health of the nodes has its own file, every action updates it and the app state is left to the poll
+        path = os.path.join(self.get_state_dir(), ELASTICSEARCH_NODES_FILE.format(asset_id=self.get_asset_id()))
+        self._nodes = NodePool(urls, selector, dead_timeout, ELASTICSEARCH_MAX_DEAD_NODE_TIMEOUT, path)
+        try:
+            # the configured URLs stay in the pool, the discovered addresses may not be reachable from here
+            self._nodes.load(sniffed=bool(sniff_interval))
+        except Exception as e:
+            self.debug_print(f"Unable to load the health of the nodes: {self._get_error_message_from_exception(e)}")
+
+        return RetVal(phantom.APP_SUCCESS, sniff_interval)
+
+    def _sniff_nodes(self):
+        """Add the nodes listed by the _nodes/http API to the pool, a failure leaves the configured URLs only"""
+
+        action_result = ActionResult()
+        ret_val, response = self._make_rest_call(ELASTICSEARCH_NODES_HTTP, action_result, params={"filter_path": "nodes.*.http.publish_address"})
+        if phantom.is_fail(ret_val):
+            self.debug_print(ELASTICSEARCH_SNIFF_FAILED_MESSAGE.format(message=action_result.get_message()))
+            # a failed discovery is not retried before the next interval either
+            self._nodes.set_sniffed(self._nodes.sniffed)
+            return
+
+        urls = publish_urls(response or {}, urllib.urlparse(self._base_url).scheme)
+        self.debug_print(ELASTICSEARCH_SNIFF_MESSAGE.format(count=len(urls), urls=", ".join(urls)))
+        self._nodes.set_sniffed(urls)
+
+    def _record_node_result(self, url, r, error):
+        """Keep a node which could not be reached or was overloaded out of the rotation for a while"""
+
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)) or (
+            r is not None and r.status_code in ELASTICSEARCH_RETRY_STATUS_CODES
+        ):
+            seconds = self._nodes.mark_failure(url)
+            self.debug_print(ELASTICSEARCH_NODE_FAILED_MESSAGE.format(url=url, seconds=seconds))
+        elif r is not None:
+            self._nodes.mark_success(url, r.elapsed.total_seconds())
+
+    def _create_session(self, config, pool_size):
+        """Build the keep-alive session that every REST call of this run goes through"""
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        session.headers.update(self._headers)
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+        session.headers["Connection"] = "keep-alive" if config.get(ELASTICSEARCH_JSON_KEEP_ALIVE, True) else "close"
+
+        session.verify = config[phantom.APP_JSON_VERIFY]
+        if self._auth_method:
+            session.auth = (self._username, self._password)
+
+        return session
+
+    def _get_connection_stats(self):
+        """Return the number of connections opened and requests sent through the session pools"""
+
+        connections = requests_made = 0
+        # the same adapter is mounted for both schemes, count it once
+        for adapter in {id(adapter): adapter for adapter in self._session.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections += pool.num_connections
+                requests_made += pool.num_requests
+
+        return connections, requests_made
+
+    def _validate_integer(self, action_result, parameter, key, allow_zero=False):
+        """Validate that the parameter is a non-negative integer, returns RetVal(status, integer)"""
+
+        if parameter is not None:
+            try:
+                if not float(parameter).is_integer():
+                    return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_INT.format(key=key)), None)
+                parameter = int(parameter)
+            except Exception:
+                return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_INT.format(key=key)), None)
+
+            if parameter < 0:
+                return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_NEGATIVE_INT.format(key=key)), None)
+            if not allow_zero and parameter == 0:
+                return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_ZERO_INT.format(key=key)), None)
+
+        return RetVal(phantom.APP_SUCCESS, parameter)
+
+    def _parse_index(self, index):
+        """Clean up a comma-separated list of indexes, removing blanks and duplicates"""
+
+        return ",".join(set(filter(None, [ind.strip() for ind in (index or "").split(",")])))
+
     def _dump_error_log(self, error, message="Exception occurred."):
         self.error_print(message, dump_object=error)
 
@@ -123,7 +372,8 @@ class ElasticsearchConnector(BaseConnector):
         # Try a json parse
         # For the valid 201 response, we are getting application/json in the header and empty json response in the body
         try:
-            resp_json = r.json() if r.text else {}
+            with self._timer.phase(ELASTICSEARCH_PHASE_JSON_DECODE):
+                resp_json = r.json() if r.text else {}
         except Exception as e:
             msg_string = ELASTICSEARCH_ERROR_JSON_PARSE.format(raw_text=r.text.replace("{", " ").replace("}", " "))
             error_message = self._get_error_message_from_exception(e)
@@ -147,6 +397,8 @@ class ElasticsearchConnector(BaseConnector):
         status_code = response.status_code
 
         try:
+            from bs4 import BeautifulSoup
+
             soup = BeautifulSoup(response.text, "html.parser")
             # Remove the script, style, footer and navigation part from the HTML message
             for element in soup(["script", "style", "footer", "nav"]):
@@ -177,13 +429,32 @@ class ElasticsearchConnector(BaseConnector):
             None,
         )
 
+    def _capture_response(self, r):
+        """Summarize a response for the debug data without keeping the whole body around.
+
+        The body itself is only captured, as a head and tail of ELASTICSEARCH_DEBUG_CAPTURE_BYTES each, for failed
+        responses or when the asset enables verbose debugging.
+        """
+
+        content = r.content or b""
+        capture = {"r_status_code": r.status_code, "r_size": len(content)}
+
+        if self._verbose_debug or not 200 <= r.status_code < 399:
+            capture["r_headers"] = dict(r.headers)
+            capture["r_sha256"] = hashlib.sha256(content).hexdigest()
+            if len(content) <= 2 * ELASTICSEARCH_DEBUG_CAPTURE_BYTES:
+                capture["r_text"] = content.decode("utf-8", errors="replace")
+            else:
+                capture["r_text_head"] = content[:ELASTICSEARCH_DEBUG_CAPTURE_BYTES].decode("utf-8", errors="replace")
+                capture["r_text_tail"] = content[-ELASTICSEARCH_DEBUG_CAPTURE_BYTES:].decode("utf-8", errors="replace")
+
+        return capture
+
     def _process_response(self, r, action_result):
-        # store the r_text in debug data, it will get dumped in the logs if the action fails
+        # store a bounded capture of the response in debug data, it will get dumped in the logs if the action fails
         if hasattr(action_result, "add_debug_data"):
             if r is not None:
-                action_result.add_debug_data({"r_text": r.text})
-                action_result.add_debug_data({"r_headers": r.headers})
-                action_result.add_debug_data({"r_status_code": r.status_code})
+                action_result.add_debug_data(self._capture_response(r))
             else:
                 action_result.add_debug_data({"r_text": "r is None"})
 
@@ -211,49 +482,176 @@ class ElasticsearchConnector(BaseConnector):
 
         return RetVal(action_result.set_status(phantom.APP_ERROR, message), None)
 
-    def _make_rest_call(self, endpoint, action_result, headers=None, json=None, params=None, method="get"):
+    def _make_rest_call(
+        self, endpoint, action_result, headers=None, json=None, data=None, params=None, method="get", idempotent=True, circuit_breaker=True
+    ):
         """Function that makes the REST call to the device, generic function that can be called from various action
-        handlers"""
-
-        if not headers:
-            headers = {}
-
-        # Get the config
-        config = self.get_config()
-
-        # Create the headers
-        headers.update(self._headers)
+        handlers. Overloaded (429/502/503/504) and unreachable responses are retried, timeouts, dropped connections and
+        gateway errors (502/504) only if the call is idempotent, the first attempt may have been applied. Without
+        circuit_breaker the call is sent even while the breaker is open and only a success is recorded, closing it."""
 
         resp_json = None
 
         # get or post or put, whatever the caller asked us to use, if not specified the default will be 'get'
-        request_func = getattr(requests, method)
-
         # handle the error in case the caller specified a non-existant method
-        if not request_func:
-            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_API_UNSUPPORTED_METHOD, method=method)
+        if method not in ELASTICSEARCH_SUPPORTED_METHODS:
+            return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_API_UNSUPPORTED_METHOD), resp_json)
 
         if self._auth_method:
             self.save_progress("Using authentication")
         else:
             self.save_progress("Not using any authentication, since either the password or username not specified")
 
-        # Make the call
-        try:
-            r = request_func(
-                f"{self._base_url}{endpoint}",  # The complete url is made up of the base_url, and the endpoint
-                auth=(self._username, self._password) if self._auth_method else None,
-                json=json,  # data is passing as json string
-                headers=headers,  # The headers to send in the HTTP call
-                verify=config[phantom.APP_JSON_VERIFY],  # should cert verification be carried out?
-                params=params,  # uri parameters if any
-                timeout=ELASTICSEARCH_DEFAULT_TIMEOUT,
+        # while the cluster is known to be unhealthy, fail fast instead of adding to its load
+        open_for = self._get_circuit_open_time() if circuit_breaker else 0
+        if open_for:
+            return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_CIRCUIT_OPEN.format(seconds=open_for)), resp_json)
+
+        timeout = (self._retry_settings[ELASTICSEARCH_JSON_CONNECT_TIMEOUT], self._retry_settings[ELASTICSEARCH_JSON_READ_TIMEOUT])
+        attempt = 0
+        while True:
+            r = error = None
+            # every attempt picks a healthy node, a retry after a failed node goes to another one
+            base_url = self._nodes.select()
+            start = time.perf_counter()
+            # Make the call, auth, cert verification and the default headers come from the pooled session
+            try:
+                r = self._session.request(
+                    method,
+                    f"{base_url}{endpoint}",  # The complete url is made up of the node url, and the endpoint
+                    json=json,  # data is passing as json string
+                    data=data,  # raw body, e.g. NDJSON for the multi search and bulk APIs
+                    headers=headers,  # The headers to send in the HTTP call, merged over the session headers
+                    params=params,  # uri parameters if any
+                    timeout=timeout,
+                )
+            except requests.exceptions.ConnectTimeout as e:
+                # the request never reached the server, it is always safe to send it again
+                error, retryable = e, True
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # the server may have processed the request, only send it again if doing so twice is harmless
+                error, retryable = e, idempotent
+            except Exception as e:
+                error, retryable = e, False
+            else:
+                # a gateway error does not tell whether the cluster got the request, only a rejection does
+                retryable = r.status_code in (ELASTICSEARCH_RETRY_STATUS_CODES if idempotent else ELASTICSEARCH_REJECTED_STATUS_CODES)
+            self._time_request(method, endpoint, attempt, r, error, time.perf_counter() - start)
+            self._record_node_result(base_url, r, error)
+
+            if not retryable or attempt >= self._retry_settings[ELASTICSEARCH_JSON_REQUEST_RETRIES] or not self._use_retry_budget():
+                break
+
+            # an unreachable node is failed over to a healthy one at once, overload responses are backed off
+            failover = r is None and any(url != base_url for url in self._nodes.alive())
+            delay = 0 if failover else self._get_retry_delay(attempt, r)
+            self.debug_print(
+                ELASTICSEARCH_RETRY_MESSAGE.format(endpoint=endpoint, reason=r.status_code if r is not None else error, delay=delay)
             )
-        except Exception as e:
-            error_message = self._get_error_message_from_exception(e)
+            with self._timer.phase(ELASTICSEARCH_PHASE_RETRY_WAIT):
+                time.sleep(delay)
+            attempt += 1
+
+        if error is None or isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            healthy = error is None and r.status_code not in ELASTICSEARCH_RETRY_STATUS_CODES
+            if circuit_breaker or healthy:
+                self._record_circuit_result(healthy)
+
+        if error is not None:
+            error_message = self._get_error_message_from_exception(error)
             return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_SERVER_MESSAGE, error_message), resp_json
 
-        return self._process_response(r, action_result)
+        ret_val, resp_json = self._process_response(r, action_result)
+        if isinstance(resp_json, dict) and isinstance(resp_json.get("took"), int):
+            # the time the cluster itself spent on the request, the rest of the wait is network and queueing
+            self._timer.add(ELASTICSEARCH_PHASE_SERVER_TOOK, resp_json["took"] / 1000)
+
+        return RetVal(ret_val, resp_json)
+
+    def _time_request(self, method, endpoint, attempt, r, error, seconds):
+        """Split the duration of one HTTP request into the wait for the response headers and the body download"""
+
+        if r is None:
+            self._timer.add(ELASTICSEARCH_PHASE_HTTP_WAIT, seconds)
+            self._timer.record(
+                {"method": method, "endpoint": endpoint, "attempt": attempt, "error": str(error), "wait_ms": round(seconds * 1000, 1)}
+            )
+            return
+
+        # elapsed runs from sending the request until the headers are parsed, it includes connecting and TLS
+        wait = min(r.elapsed.total_seconds(), seconds)
+        self._timer.add(ELASTICSEARCH_PHASE_HTTP_WAIT, wait)
+        self._timer.add(ELASTICSEARCH_PHASE_HTTP_TRANSFER, seconds - wait)
+        self._timer.record(
+            {
+                "method": method,
+                "endpoint": endpoint,
+                "attempt": attempt,
+                "status_code": r.status_code,
+                "bytes": len(r.content or b""),
+                "wait_ms": round(wait * 1000, 1),
+                "transfer_ms": round((seconds - wait) * 1000, 1),
+            }
+        )
+
+    def _use_retry_budget(self):
+        """Take one retry from the budget of the action, returns False once it is spent"""
+
+        with self._lock:
+            if self._retry_budget <= 0:
+                return False
+            self._retry_budget -= 1
+            return True
+
+    def _get_retry_delay(self, attempt, r):
+        """Seconds to wait before the next attempt, the server's Retry-After if it sent one, else a jittered exponential backoff"""
+
+        if r is not None:
+            retry_after = r.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(int(retry_after), ELASTICSEARCH_RETRY_MAX_DELAY)
+
+        # full jitter, so the retries of concurrent actions do not hit the cluster in waves
+        return random.uniform(0, min(ELASTICSEARCH_RETRY_MAX_DELAY, ELASTICSEARCH_RETRY_BASE_DELAY * 2**attempt))  # nosemgrep
+
+    def _get_circuit_open_time(self):
+        """Return the number of seconds the circuit breaker stays open, 0 when requests are allowed"""
+
+        threshold = self._retry_settings[ELASTICSEARCH_JSON_BREAKER_THRESHOLD]
+        breaker = self._get_circuit_breaker()
+        if not threshold or not breaker or breaker.get("failures", 0) < threshold:
+            return 0
+
+        # once the cooldown is over the circuit is half open, the next request probes the cluster
+        remaining = breaker.get("opened_at", 0) + self._retry_settings[ELASTICSEARCH_JSON_BREAKER_COOLDOWN] - time.time()
+        return int(remaining) + 1 if remaining > 0 else 0
+
+    def _get_circuit_breaker(self):
+        """The breaker saved in the app state, None when it was counting the failures of other node URLs"""
+
+        breaker = self._state.get(ELASTICSEARCH_STATE_CIRCUIT_BREAKER)
+        # once the URLs of the asset are changed, e.g. to correct them, the failures of the old ones do not count
+        if not isinstance(breaker, dict) or breaker.get("nodes") != sorted(self._node_urls):
+            return None
+        return breaker
+
+    def _record_circuit_result(self, healthy):
+        """Count the consecutive failed requests in the app state, the circuit opens once they reach the threshold"""
+
+        if not self._retry_settings[ELASTICSEARCH_JSON_BREAKER_THRESHOLD]:
+            return
+
+        with self._lock:
+            if healthy:
+                self._state.pop(ELASTICSEARCH_STATE_CIRCUIT_BREAKER, None)
+                return
+
+            breaker = self._get_circuit_breaker()
+            if breaker is None:
+                breaker = self._state[ELASTICSEARCH_STATE_CIRCUIT_BREAKER] = {"nodes": sorted(self._node_urls), "failures": 0}
+            breaker["failures"] = breaker.get("failures", 0) + 1
+            if breaker["failures"] >= self._retry_settings[ELASTICSEARCH_JSON_BREAKER_THRESHOLD]:
+                breaker["opened_at"] = time.time()
 
     def _test_connectivity(self, param):
         """Function that handles the test connectivity action, it is much simpler than other action handlers."""
@@ -268,7 +666,8 @@ class ElasticsearchConnector(BaseConnector):
         self.save_progress(ELASTICSEARCH_MESSAGE_CLUSTER_HEALTH)
 
         # Make the rest endpoint call
-        ret_val, response = self._make_rest_call(ELASTICSEARCH_CLUSTER_HEALTH, action_result)
+        # the test is how a fixed asset is checked, it always reaches the cluster and closes the breaker if it succeeds
+        ret_val, response = self._make_rest_call(ELASTICSEARCH_CLUSTER_HEALTH, action_result, circuit_breaker=False)
 
         # Process errors
         if phantom.is_fail(ret_val):
@@ -306,10 +705,9 @@ class ElasticsearchConnector(BaseConnector):
             error_message = self._get_error_message_from_exception(e)
             return action_result.set_status(phantom.APP_ERROR, f"Unable to load query json. Error: {error_message}")
 
-        index = [ind.strip() for ind in param.get(ELASTICSEARCH_JSON_INDEX).split(",")]
-        index = ",".join(set(filter(None, index)))
+        index = self._parse_index(param.get(ELASTICSEARCH_JSON_INDEX))
         if not index:
-            return self._action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_ACTION_PARAM.format(key="index"))
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_ACTION_PARAM.format(key="index"))
         endpoint = ELASTICSEARCH_QUERY_SEARCH_WITH_INDEX.format(index)
 
         routing = param.get(ELASTICSEARCH_JSON_ROUTING)
@@ -318,138 +716,2116 @@ class ElasticsearchConnector(BaseConnector):
         if routing:
             params = {"routing": urllib.quote(routing)}
 
+        ret_val, search_params = self._get_projection_params(action_result, param)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
         # Connectivity
         self.save_progress(phantom.APP_PROG_CONNECTING_TO_ELLIPSES, self._host)
 
-        # Make the rest endpoint call
-        ret_val, response = self._make_rest_call(endpoint, action_result, json=query_json, params=params, method="post")
+        time_field = param.get(ELASTICSEARCH_JSON_TIME_FIELD)
+        if time_field:
+            ret_val, time_range = self._get_time_range(action_result, param)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
+
+        summary_only = param.get(ELASTICSEARCH_JSON_SUMMARY_ONLY, False)
+        if summary_only:
+            # only the totals are needed, do not fetch any document
+            query_json = dict(query_json or {})
+            query_json["size"] = 0
+            if time_field:
+                query_json = self._window_query(query_json, time_field, time_range)
+
+        if (param.get(ELASTICSEARCH_JSON_PAGINATE, False) or time_field) and not summary_only:
+            ret_val, page_size = self._validate_integer(
+                action_result, param.get(ELASTICSEARCH_JSON_PAGE_SIZE, ELASTICSEARCH_DEFAULT_PAGE_SIZE), ELASTICSEARCH_JSON_PAGE_SIZE
+            )
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
 
-        # Process errors
+            ret_val, max_hits = self._validate_integer(
+                action_result, param.get(ELASTICSEARCH_JSON_MAX_HITS, ELASTICSEARCH_DEFAULT_MAX_HITS), ELASTICSEARCH_JSON_MAX_HITS
+            )
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
+
+            if time_field:
+                return self._run_windowed_query(
+                    action_result, index, query_json, params, search_params, page_size, max_hits, time_field, time_range
+                )
+
+            return self._run_paginated_query(action_result, index, query_json, params, search_params, page_size, max_hits)
+
+        # identical searches within the cache TTL are answered from the state directory
+        response = None
+        ret_val, cache = self._get_query_cache(action_result)
         if phantom.is_fail(ret_val):
-            # Dump error messages in the log
-            self.debug_print(action_result.get_message())
             return action_result.get_status()
+        if cache:
+            cache_key = cache.make_key(sorted(index.split(",")), query_json, routing, search_params, summary_only)
+            with self._timer.phase(ELASTICSEARCH_PHASE_CACHE):
+                response = cache.get(cache_key)
+            action_result.update_summary({ELASTICSEARCH_JSON_CACHE: "hit" if response is not None else "miss"})
+
+        if search_params:
+            params = dict(params or {}, **search_params)
+
+        if response is None:
+            # Make the rest endpoint call
+            ret_val, response = self._make_rest_call(endpoint, action_result, json=query_json, params=params, method="post")
+
+            # Process errors
+            if phantom.is_fail(ret_val):
+                # Dump error messages in the log
+                self.debug_print(action_result.get_message())
+                return action_result.get_status()
+
+            if cache:
+                with self._timer.phase(ELASTICSEARCH_PHASE_CACHE):
+                    cache.set(cache_key, response)
 
         action_result.update_summary(
             {
                 ELASTICSEARCH_JSON_TOTAL_HITS: response.get("hits", {}).get("total", {}).get("value", 0),
                 ELASTICSEARCH_JSON_TIMED_OUT: response.get("timed_out", False),
+                ELASTICSEARCH_JSON_TOOK: response.get("took"),
             }
         )
 
-        action_result.add_data(response)
+        if not summary_only:
+            action_result.add_data(response)
 
         # Set the Status
         return action_result.set_status(phantom.APP_SUCCESS)
 
-    def _get_config(self, param):
+    def _run_multi_query(self, param):
+        """Action handler for the 'run multi query' action, all the queries are sent in a single _msearch request"""
+
         action_result = self.add_action_result(ActionResult(dict(param)))
+
+        try:
+            queries = json.loads(param[ELASTICSEARCH_JSON_QUERIES])
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, f"Unable to load queries json. Error: {error_message}")
+
+        if not isinstance(queries, list) or not queries or not all(isinstance(entry, dict) for entry in queries):
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_QUERIES)
+
+        ret_val, max_concurrent_searches = self._validate_integer(
+            action_result, param.get(ELASTICSEARCH_JSON_MAX_CONCURRENT_SEARCHES), ELASTICSEARCH_JSON_MAX_CONCURRENT_SEARCHES
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        # every search is a header line (index, routing) followed by the query line
+        lines = []
+        for position, entry in enumerate(queries):
+            index = entry.get(ELASTICSEARCH_JSON_INDEX)
+            if isinstance(index, list):
+                index = ",".join(index)
+            index = self._parse_index(index)
+            if not index:
+                return action_result.set_status(
+                    phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_QUERY_ENTRY.format(position=position, key="index")
+                )
+
+            query = entry.get(ELASTICSEARCH_JSON_QUERY) or {}
+            if isinstance(query, str):
+                try:
+                    query = json.loads(query)
+                except Exception:
+                    return action_result.set_status(
+                        phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_QUERY_ENTRY.format(position=position, key="query")
+                    )
+
+            header = {"index": index}
+            if entry.get(ELASTICSEARCH_JSON_ROUTING):
+                header["routing"] = entry[ELASTICSEARCH_JSON_ROUTING]
+
+            entry[ELASTICSEARCH_JSON_INDEX] = index
+            lines.append(json.dumps(header))
+            lines.append(json.dumps(query))
+
+        params = None
+        if max_concurrent_searches:
+            params = {"max_concurrent_searches": max_concurrent_searches}
+
         # Connectivity
         self.save_progress(phantom.APP_PROG_CONNECTING_TO_ELLIPSES, self._host)
 
-        # Make the rest endpoint call
-        ret_val, response = self._make_rest_call(ELASTICSEARCH_GET_INDEXES, action_result)
-
-        # Process errors
+        ret_val, response = self._make_rest_call(
+            ELASTICSEARCH_MULTI_SEARCH,
+            action_result,
+            headers={"Content-Type": "application/x-ndjson"},
+            data="\n".join(lines) + "\n",
+            params=params,
+            method="post",
+        )
         if phantom.is_fail(ret_val):
-            # Dump error messages in the log
             self.debug_print(action_result.get_message())
             return action_result.get_status()
 
-        for indices in response:
+        successful = 0
+        for entry, sub_response in zip(queries, response.get("responses", [])):
+            error = sub_response.get("error")
             data = {
-                "index": indices.get("index"),
-                "health": indices.get("health"),
-                "status": indices.get("status"),
-                "document_count": indices.get("docs.count"),
-                "store_size": indices.get("store.size"),
+                ELASTICSEARCH_JSON_INDEX: entry[ELASTICSEARCH_JSON_INDEX],
+                ELASTICSEARCH_JSON_ROUTING: entry.get(ELASTICSEARCH_JSON_ROUTING),
+                "status": "failed" if error else "success",
+                "status_code": sub_response.get("status"),
+                ELASTICSEARCH_JSON_TOTAL_HITS: sub_response.get("hits", {}).get("total", {}).get("value", 0),
+                ELASTICSEARCH_JSON_TIMED_OUT: sub_response.get("timed_out", False),
+                ELASTICSEARCH_JSON_TOOK: sub_response.get("took"),
+                "error": (error.get("reason") or error.get("type")) if isinstance(error, dict) else error,
+                "response": sub_response,
             }
+            if not error:
+                successful += 1
             action_result.add_data(data)
 
-        action_result.update_summary({"total_indices": len(response)})
+        action_result.update_summary(
+            {
+                ELASTICSEARCH_JSON_TOTAL_QUERIES: len(queries),
+                ELASTICSEARCH_JSON_SUCCESSFUL_QUERIES: successful,
+                ELASTICSEARCH_JSON_FAILED_QUERIES: len(queries) - successful,
+            }
+        )
 
-        # Set the Status
         return action_result.set_status(phantom.APP_SUCCESS)
 
-    def _save_container(self, container_dict):
-        config = self.get_config()
-        container = container_dict.get("container")
-        container["label"] = config.get("ingest", {}).get("container_label")
-        container["artifacts"] = container_dict.get("artifacts")
+    def _run_aggregation(self, param):
+        """Action handler for the 'run aggregation' action, only the aggregations are requested and they are
+        flattened into a table with one column per bucket key and metric"""
 
-        return self.save_container(container)
+        action_result = self.add_action_result(ActionResult(dict(param)))
 
-    def _on_poll(self, param):
-        container_count = param.get("container_count", 0)
+        try:
+            query_json = json.loads(param[ELASTICSEARCH_JSON_QUERY])
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, f"Unable to load query json. Error: {error_message}")
+
+        if not isinstance(query_json, dict) or not (query_json.get("aggs") or query_json.get("aggregations")):
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_NO_AGGREGATIONS)
+
+        index = self._parse_index(param.get(ELASTICSEARCH_JSON_INDEX))
+        if not index:
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_ACTION_PARAM.format(key="index"))
+
+        output_format = param.get(ELASTICSEARCH_JSON_OUTPUT_FORMAT, ELASTICSEARCH_OUTPUT_FORMAT_ROWS)
+        if output_format not in ELASTICSEARCH_OUTPUT_FORMATS:
+            return action_result.set_status(
+                phantom.APP_ERROR,
+                ELASTICSEARCH_ERROR_VALUE_LIST.format(key=ELASTICSEARCH_JSON_OUTPUT_FORMAT, values=ELASTICSEARCH_OUTPUT_FORMATS),
+            )
+
+        ret_val, max_rows = self._validate_integer(
+            action_result, param.get(ELASTICSEARCH_JSON_MAX_ROWS, ELASTICSEARCH_DEFAULT_MAX_ROWS), ELASTICSEARCH_JSON_MAX_ROWS
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        # no hits and no hit count, the response only carries the aggregation tree
+        query_json["size"] = 0
+        query_json["track_total_hits"] = False
+        params = {"filter_path": ELASTICSEARCH_AGGREGATION_FILTER_PATH}
+        if param.get(ELASTICSEARCH_JSON_ROUTING):
+            params["routing"] = urllib.quote(param[ELASTICSEARCH_JSON_ROUTING])
+
+        # Connectivity
+        self.save_progress(phantom.APP_PROG_CONNECTING_TO_ELLIPSES, self._host)
+
+        ret_val, response = self._make_rest_call(
+            ELASTICSEARCH_QUERY_SEARCH_WITH_INDEX.format(index), action_result, json=query_json, params=params, method="post"
+        )
+        if phantom.is_fail(ret_val):
+            self.debug_print(action_result.get_message())
+            return action_result.get_status()
+
+        rows = self._flatten_aggregations(response.get("aggregations", {}))
+        total_rows = len(rows)
+        rows = rows[:max_rows]
+
+        columns = []
+        for row in rows:
+            columns.extend(column for column in row if column not in columns)
+
+        if output_format == ELASTICSEARCH_OUTPUT_FORMAT_COLUMNS:
+            action_result.add_data({column: [row.get(column) for row in rows] for column in columns})
+        else:
+            for row in rows:
+                action_result.add_data(row)
+
+        action_result.update_summary(
+            {
+                ELASTICSEARCH_JSON_TOTAL_ROWS: total_rows,
+                ELASTICSEARCH_JSON_RETURNED_ROWS: len(rows),
+                ELASTICSEARCH_JSON_COLUMNS: columns,
+                ELASTICSEARCH_JSON_TIMED_OUT: response.get("timed_out", False),
+                ELASTICSEARCH_JSON_TOOK: response.get("took"),
+            }
+        )
+
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _flatten_aggregations(self, aggregations, row=None):
+        """Turn an aggregation tree into rows, one per leaf bucket.
+
+        Every bucket aggregation adds a column with the bucket key and one with '<name>.doc_count', metrics add a
+        '<name>' column, or '<name>.<value>' for the multi value ones (stats, percentiles). Sibling bucket
+        aggregations each add their own rows, single bucket aggregations (filter, nested) only add their doc_count.
+        """
+
+        row = dict(row or {})
+        bucket_aggregations = []
+        for name, aggregation in aggregations.items():
+            if not isinstance(aggregation, dict):
+                continue
+
+            if "buckets" in aggregation:
+                buckets = aggregation["buckets"]
+                if isinstance(buckets, dict):
+                    # keyed buckets, e.g. from the filters aggregation
+                    buckets = [dict(bucket, key=key) for key, bucket in buckets.items()]
+                bucket_aggregations.append((name, buckets, True))
+            elif "doc_count" in aggregation:
+                bucket_aggregations.append((name, [aggregation], False))
+            elif "value" in aggregation:
+                row[name] = aggregation.get("value_as_string", aggregation["value"])
+            elif isinstance(aggregation.get("values"), dict):
+                row.update({f"{name}.{key}": value for key, value in aggregation["values"].items()})
+            elif isinstance(aggregation.get("values"), list):
+                row.update({f"{name}.{value.get('key')}": value.get("value") for value in aggregation["values"]})
+            elif "hits" in aggregation:
+                row[name] = [hit.get("_source", hit.get("fields")) for hit in aggregation["hits"].get("hits", [])]
+            else:
+                row.update(
+                    {f"{name}.{key}": value for key, value in aggregation.items() if key != "meta" and not isinstance(value, (dict, list))}
+                )
+
+        if not bucket_aggregations:
+            return [row]
+
+        rows = []
+        for name, buckets, keyed in bucket_aggregations:
+            for bucket in buckets:
+                bucket_row = dict(row)
+                if keyed:
+                    bucket_row[name] = bucket.get("key_as_string", bucket.get("key"))
+                bucket_row[f"{name}.doc_count"] = bucket.get("doc_count")
+                sub_aggregations = {key: value for key, value in bucket.items() if key not in ELASTICSEARCH_BUCKET_KEYS}
+                rows.extend(self._flatten_aggregations(sub_aggregations, bucket_row))
+
+        # a bucket whose sub-aggregations found no buckets still shows up, with its own columns only
+        return rows or [row]
+
+    def _get_query_cache(self, action_result):
+        """Return RetVal(status, result cache), the cache is None when it is not enabled on the asset"""
 
         config = self.get_config()
-        if not all(field in config for field in self.REQUIRED_INGESTION_FIELDS):
-            return self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ON_POLL_ERROR_MESSAGE)
+        ret_val, ttl = self._validate_integer(
+            action_result,
+            config.get(ELASTICSEARCH_JSON_CACHE_TTL, ELASTICSEARCH_DEFAULT_CACHE_TTL),
+            ELASTICSEARCH_JSON_CACHE_TTL,
+            allow_zero=True,
+        )
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
 
-        query_params = {ELASTICSEARCH_JSON_INDEX: config["ingest_index"], ELASTICSEARCH_JSON_QUERY: config["ingest_query"]}
-        if "ingest_routing" in config:
-            query_params[ELASTICSEARCH_JSON_ROUTING] = config["ingest_routing"]
+        if not ttl:
+            return RetVal(phantom.APP_SUCCESS, None)
 
-        self.save_progress("Quering data for {} index".format(config["ingest_index"]))
-        ret_val = self._run_query(query_params)
+        ret_val, max_entries = self._validate_integer(
+            action_result, config.get(ELASTICSEARCH_JSON_CACHE_SIZE, ELASTICSEARCH_DEFAULT_CACHE_SIZE), ELASTICSEARCH_JSON_CACHE_SIZE
+        )
         if phantom.is_fail(ret_val):
-            return ret_val
+            return RetVal(action_result.get_status(), None)
+
+        directory = os.path.join(self.get_state_dir(), ELASTICSEARCH_QUERY_CACHE_DIR.format(asset_id=self.get_asset_id()))
+        return RetVal(phantom.APP_SUCCESS, ResultCache(directory, ttl, max_entries, ELASTICSEARCH_CACHE_MAX_ENTRY_BYTES))
+
+    def _get_projection_params(self, action_result, param):
+        """Build the URL parameters which trim the search response on the server, returns RetVal(status, params)"""
+
+        search_params = {}
+        for key, search_key in (
+            (ELASTICSEARCH_JSON_SOURCE_INCLUDES, "_source_includes"),
+            (ELASTICSEARCH_JSON_SOURCE_EXCLUDES, "_source_excludes"),
+            (ELASTICSEARCH_JSON_FILTER_PATH, "filter_path"),
+        ):
+            fields = ",".join(filter(None, [field.strip() for field in (param.get(key) or "").split(",")]))
+            if fields:
+                search_params[search_key] = fields
+
+        track_total_hits = str(param.get(ELASTICSEARCH_JSON_TRACK_TOTAL_HITS) or "").strip().lower()
+        if track_total_hits in ("true", "false"):
+            search_params["track_total_hits"] = track_total_hits
+        elif track_total_hits:
+            ret_val, track_total_hits = self._validate_integer(
+                action_result, track_total_hits, ELASTICSEARCH_JSON_TRACK_TOTAL_HITS, allow_zero=True
+            )
+            if phantom.is_fail(ret_val):
+                return RetVal(action_result.get_status(), None)
+            search_params["track_total_hits"] = track_total_hits
 
-        action_results = self.get_action_results()
-        parser = config.get("ingest_parser")
-        for action_result in action_results:
-            for data in action_result.get_data():
-                saved_stdout = sys.stdout
-                debug_out = PhantomDebugWriter(self)
-                if parser:
-                    parser_name = config["ingest_parser__filename"]
-                    self.save_progress(f"Using specified parser: {parser_name}")
-                    ingest_parser = imp.new_module("custom_parser")
-                    try:
-                        sys.stdout = debug_out
-                        exec(parser, ingest_parser.__dict__)
-                        ret_dict_list = ingest_parser.ingest_parser(data)
-                    except Exception as e:
-                        error_message = self._get_error_message_from_exception(e)
-                        return action_result.set_status(phantom.APP_ERROR, f"Unable to execute ingest parser: {error_message}")
-                    finally:
-                        sys.stdout = saved_stdout
-                else:
-                    sys.stdout = debug_out
-                    ret_dict_list = elasticsearch_parser.ingest_parser(data)
-                    sys.stdout = saved_stdout
+        return RetVal(phantom.APP_SUCCESS, search_params)
 
-                if not ret_dict_list:
-                    continue
+    def _run_paginated_query(self, action_result, index, query_json, params, search_params, page_size, max_hits):
+        """Walk the results of the 'run query' action page by page, adding every page as a separate data item"""
+
+        total_hits = returned_hits = pages = 0
+        timed_out = False
 
-                if container_count and self.is_poll_now() and container_count < len(ret_dict_list):
-                    ret_dict_list = ret_dict_list[:container_count]
+        for ret_val, response in self._search_pages(
+            action_result, index, query_json, params=params, search_params=search_params, page_size=page_size, max_hits=max_hits
+        ):
+            if phantom.is_fail(ret_val):
+                self.debug_print(action_result.get_message())
+                return action_result.get_status()
 
-                for ret_dict in ret_dict_list:
-                    self._save_container(ret_dict)
+            if not pages:
+                total_hits = response.get("hits", {}).get("total", {}).get("value", 0)
+
+            pages += 1
+            returned_hits += len(response.get("hits", {}).get("hits", []))
+            timed_out = timed_out or response.get("timed_out", False)
+
+            # the PIT id is an opaque token which is only meaningful while the search is running
+            response.pop("pit_id", None)
+            action_result.add_data(response)
+
+        action_result.update_summary(
+            {
+                ELASTICSEARCH_JSON_TOTAL_HITS: total_hits,
+                ELASTICSEARCH_JSON_TIMED_OUT: timed_out,
+                ELASTICSEARCH_JSON_RETURNED_HITS: returned_hits,
+                ELASTICSEARCH_JSON_PAGES: pages,
+            }
+        )
 
         return action_result.set_status(phantom.APP_SUCCESS)
 
-    def handle_action(self, param):
-        """Function that handles all the actions"""
+    def _get_time_range(self, action_result, param):
+        """Return RetVal(status, (start, end)) of the start_time and end_time parameters, as a [start, end) range of
+        epoch milliseconds which includes the end time. The end time defaults to now.
+        """
 
-        # Get the action that we are supposed to carry out, set it in the connection result object
-        action = self.get_action_identifier()
+        times = {}
+        for key, default in ((ELASTICSEARCH_JSON_START_TIME, None), (ELASTICSEARCH_JSON_END_TIME, int(time.time() * 1000))):
+            value = param.get(key)
+            if value is None or value == "":
+                if default is None:
+                    return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_ACTION_PARAM.format(key=key)), None)
+                times[key] = default
+                continue
 
-        # Intialize it to success
-        ret_val = phantom.APP_SUCCESS
+            try:
+                times[key] = parse_time(value)
+            except ValueError:
+                return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_TIME.format(key=key)), None)
 
-        # Bunch if if..elif to process actions
-        if action == self.ACTION_ID_RUN_QUERY:
-            ret_val = self._run_query(param)
-        elif action == self.ACTION_ID_GET_CONFIG:
-            ret_val = self._get_config(param)
-        elif action == phantom.ACTION_ID_TEST_ASSET_CONNECTIVITY:
-            ret_val = self._test_connectivity(param)
-        elif action == phantom.ACTION_ID_INGEST_ON_POLL:
-            ret_val = self._on_poll(param)
+        start, end = times[ELASTICSEARCH_JSON_START_TIME], times[ELASTICSEARCH_JSON_END_TIME]
+        if start > end:
+            return RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_TIME_RANGE), None)
 
-        return ret_val
+        return RetVal(phantom.APP_SUCCESS, (start, end + 1))
+
+    def _run_windowed_query(self, action_result, index, query_json, params, search_params, page_size, max_hits, time_field, time_range):
+        """Search the time range of the 'run query' action in adaptive time windows, see _search_windows.
+
+        The windows share one point in time, so the hits counted while sizing them are the hits returned. Every page
+        is a separate data item, in time order. When a window fails, the hits of the windows before it are kept and
+        the summary tells where to resume from.
+        """
+
+        ret_val, window_settings = self._get_window_settings(action_result)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+        target_hits, concurrency = window_settings
+
+        query_json = dict(query_json or {})
+        query_json.setdefault("sort", [{time_field: "asc"}])
+
+        ret_val, pit_id = self._open_pit(action_result, index, params)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        start, end = time_range
+        total_hits = returned_hits = pages = windows = 0
+        timed_out = False
+        completed_until = start
+        last_sort = None
+        current_window = None
+        window_hits = 0
+        windows_iter = self._search_windows(
+            action_result,
+            index,
+            query_json,
+            time_field,
+            start,
+            end,
+            target_hits,
+            concurrency,
+            search_params=search_params,
+            page_size=page_size,
+            pit_id=pit_id,
+        )
+        try:
+            for ret_val, result in windows_iter:
+                if phantom.is_fail(ret_val):
+                    self.debug_print(action_result.get_message())
+                    break
+
+                window, hits, response = result
+                if window != current_window:
+                    current_window = window
+                    windows += 1
+                    total_hits += hits
+                    window_hits = 0
+
+                if response is not None:
+                    page_hits = response.get("hits", {}).get("hits", [])
+                    if max_hits and returned_hits + len(page_hits) > max_hits:
+                        del page_hits[max_hits - returned_hits :]
+                    pages += 1
+                    returned_hits += len(page_hits)
+                    window_hits += len(page_hits)
+                    timed_out = timed_out or response.get("timed_out", False)
+                    action_result.add_data(response)
+                    if page_hits:
+                        last_sort = page_hits[-1].get("sort")
+
+                stopped = bool(max_hits) and returned_hits >= max_hits
+                # the hits were counted on the same point in time, a window cut short by max_hits is not complete
+                if (response is None or stopped) and window_hits >= hits:
+                    completed_until = window[1]
+                if stopped:
+                    break
+        finally:
+            windows_iter.close()
+            self._close_pit(pit_id)
+
+        action_result.update_summary(
+            {
+                ELASTICSEARCH_JSON_TOTAL_HITS: total_hits,
+                ELASTICSEARCH_JSON_TIMED_OUT: timed_out,
+                ELASTICSEARCH_JSON_RETURNED_HITS: returned_hits,
+                ELASTICSEARCH_JSON_PAGES: pages,
+                ELASTICSEARCH_JSON_WINDOWS: windows,
+                ELASTICSEARCH_JSON_COMPLETED_UNTIL: completed_until,
+                # where the hits returned end inside the window after completed_until, if they do
+                ELASTICSEARCH_JSON_LAST_SORT: last_sort if completed_until < end else None,
+            }
+        )
+
+        if phantom.is_fail(ret_val):
+            return action_result.set_status(
+                phantom.APP_ERROR, ELASTICSEARCH_ERROR_WINDOW_FAILED.format(message=action_result.get_message(), completed_until=completed_until)
+            )
+
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _open_pit(self, action_result, index, params=None):
+        """Open a point in time on the index, returns RetVal(status, pit id)"""
+
+        pit_params = dict(params or {})
+        pit_params["keep_alive"] = ELASTICSEARCH_PIT_KEEP_ALIVE
+
+        ret_val, response = self._make_rest_call(ELASTICSEARCH_OPEN_PIT.format(index), action_result, params=pit_params, method="post")
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        return RetVal(phantom.APP_SUCCESS, response.get("id"))
+
+    def _close_pit(self, pit_id):
+        """Release the point in time, a PIT which cannot be closed simply expires after its keep alive"""
+
+        action_result = ActionResult()
+        ret_val, _ = self._make_rest_call(ELASTICSEARCH_CLOSE_PIT, action_result, json={"id": pit_id}, method="delete")
+        if phantom.is_fail(ret_val):
+            self.debug_print(f"Unable to close point in time: {action_result.get_message()}")
+
+    def _search_pages(
+        self,
+        action_result,
+        index,
+        query_json,
+        params=None,
+        search_params=None,
+        page_size=ELASTICSEARCH_DEFAULT_PAGE_SIZE,
+        max_hits=None,
+        search_after=None,
+        use_pit=True,
+        pit_id=None,
+    ):
+        """Generator that walks a search with search_after, one page per request.
+
+        Every item is a RetVal(status, search response). Once a failed status is yielded the generator stops, the
+        details are set on the action_result. With use_pit the pages are read from a point in time which is closed
+        when the generator finishes, otherwise the query must carry its own unique sort, a value followed by a
+        tiebreaker. A query sorted on fewer fields is read from a point in time anyway, search_after on it would skip
+        the hits sharing the sort values at a page boundary. A pit_id opened by the caller is used as is and left
+        open. The routing params select the shards, the search_params are only added to the search requests.
+        """
+
+        body = dict(query_json or {})
+        body.pop("from", None)
+
+        if not use_pit and not pit_id and len(body.get("sort") or []) < 2:
+            # a point in time adds the implicit _shard_doc tiebreaker to any sort
+            use_pit = True
+
+        endpoint = ELASTICSEARCH_QUERY_SEARCH_WITH_INDEX.format(index)
+        own_pit = use_pit and not pit_id
+        if own_pit:
+            ret_val, pit_id = self._open_pit(action_result, index, params)
+            if phantom.is_fail(ret_val):
+                yield RetVal(action_result.get_status(), None)
+                return
+
+        if pit_id:
+            # the index and routing are part of the point in time, the search itself must not carry them
+            endpoint = ELASTICSEARCH_QUERY_SEARCH
+            params = None
+            body.setdefault("sort", [{"_shard_doc": "asc"}])
+
+        if search_params:
+            params = dict(params or {}, **search_params)
+            # the paging itself needs the sort values and the PIT id, keep them in a filtered response
+            if params.get("filter_path"):
+                params["filter_path"] = ",".join([params["filter_path"], *ELASTICSEARCH_PAGING_FILTER_PATH])
+
+        fetched = 0
+        try:
+            while True:
+                body["size"] = min(page_size, max_hits - fetched) if max_hits else page_size
+                if pit_id:
+                    body["pit"] = {"id": pit_id, "keep_alive": ELASTICSEARCH_PIT_KEEP_ALIVE}
+                if search_after:
+                    body["search_after"] = search_after
+
+                ret_val, response = self._make_rest_call(endpoint, action_result, json=body, params=params, method="post")
+                if phantom.is_fail(ret_val):
+                    yield RetVal(action_result.get_status(), None)
+                    return
+
+                # the PIT id can change between requests, always continue with the latest one
+                pit_id = response.get("pit_id", pit_id)
+                hits = response.get("hits", {}).get("hits", [])
+                if hits or not fetched:
+                    yield RetVal(phantom.APP_SUCCESS, response)
+
+                fetched += len(hits)
+                if len(hits) < body["size"] or (max_hits and fetched >= max_hits):
+                    return
+
+                search_after = hits[-1].get("sort")
+                if not search_after:
+                    return
+
+                # the total only needs to be counted on the first page
+                body["track_total_hits"] = False
+        finally:
+            if own_pit and pit_id:
+                self._close_pit(pit_id)
+
+    def _get_window_settings(self, action_result):
+        """Return RetVal(status, (target hits per window, windows searched concurrently)) from the asset config"""
+
+        config = self.get_config()
+        settings = []
+        for key, default in (
+            (ELASTICSEARCH_JSON_WINDOW_TARGET_HITS, ELASTICSEARCH_DEFAULT_WINDOW_TARGET_HITS),
+            (ELASTICSEARCH_JSON_WINDOW_CONCURRENCY, ELASTICSEARCH_DEFAULT_WINDOW_CONCURRENCY),
+        ):
+            ret_val, value = self._validate_integer(action_result, config.get(key, default), key)
+            if phantom.is_fail(ret_val):
+                return RetVal(action_result.get_status(), None)
+            settings.append(value)
+
+        return RetVal(phantom.APP_SUCCESS, tuple(settings))
+
+    def _window_query(self, query_json, timestamp_field, window):
+        """The query restricted to the [start, end) window of epoch milliseconds"""
+
+        body = dict(query_json)
+        time_range = {"range": {timestamp_field: {"gte": window[0], "lt": window[1], "format": "epoch_millis"}}}
+        if body.get("query"):
+            body["query"] = {"bool": {"must": [body["query"]], "filter": [time_range]}}
+        else:
+            body["query"] = {"bool": {"filter": [time_range]}}
+        return body
+
+    def _count_window(self, action_result, index, body, params=None, pit_id=None):
+        """Return RetVal(status, number of hits of the window query)"""
+
+        count_body = {"query": body["query"], "size": 0, "track_total_hits": True}
+        endpoint = ELASTICSEARCH_QUERY_SEARCH_WITH_INDEX.format(index)
+        if pit_id:
+            count_body["pit"] = {"id": pit_id, "keep_alive": ELASTICSEARCH_PIT_KEEP_ALIVE}
+            endpoint = ELASTICSEARCH_QUERY_SEARCH
+            params = None
+
+        ret_val, response = self._make_rest_call(endpoint, action_result, json=count_body, params=params, method="post")
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        return RetVal(phantom.APP_SUCCESS, response.get("hits", {}).get("total", {}).get("value", 0))
+
+    def _search_windows(
+        self,
+        action_result,
+        index,
+        query_json,
+        timestamp_field,
+        start,
+        end,
+        target_hits,
+        concurrency,
+        params=None,
+        search_params=None,
+        page_size=ELASTICSEARCH_DEFAULT_PAGE_SIZE,
+        pit_id=None,
+    ):
+        """Generator that splits a search over the [start, end) time range into windows of about target_hits hits.
+
+        The windows are sized by counting their hits first, see TimeWindowPlanner, and up to concurrency of them are
+        paged through with _search_pages on a worker pool. Every item is a RetVal(status, (window, hits, response)),
+        one per page as it arrives and then one with a None response which ends the window, in the order of the
+        windows, so everything before the end of the last ended window is complete. The workers of the later windows
+        wait once they fetched a page ahead, so at most about two pages per worker are held. Once a failed status is
+        yielded the generator stops, the details are set on the action_result. Without a pit_id the windows are paged
+        on the unique sort of the query, see _search_pages, a search_after in it only applies to the first window.
+        """
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        body = dict(query_json or {})
+        search_after = body.pop("search_after", None)
+        planner = TimeWindowPlanner(start, end, target_hits)
+
+        # windows in flight, oldest first: (window, hits, action result of the window, page queue, future or None if empty)
+        pending = collections.deque()
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            while pending or not planner.done:
+                # the windows are planned one after the other, while the ones planned earlier are being fetched
+                while len(pending) < concurrency and not planner.done:
+                    window = planner.propose()
+                    window_body = self._window_query(body, timestamp_field, window)
+                    ret_val, hits = self._count_window(action_result, index, window_body, params, pit_id)
+                    if phantom.is_fail(ret_val):
+                        yield RetVal(action_result.get_status(), None)
+                        return
+
+                    if not planner.feedback(window, hits):
+                        continue
+
+                    future = None
+                    window_result = ActionResult()
+                    window_pages = queue.Queue(maxsize=ELASTICSEARCH_WINDOW_QUEUE_SIZE)
+                    if hits:
+                        future = executor.submit(
+                            self._fetch_window,
+                            window_result,
+                            index,
+                            window_body,
+                            params,
+                            search_params,
+                            page_size,
+                            search_after if window[0] == start else None,
+                            pit_id,
+                            window_pages,
+                            stop,
+                        )
+                    pending.append((window, hits, window_result, window_pages, future))
+
+                window, hits, window_result, window_pages, future = pending.popleft()
+                ret_val = phantom.APP_SUCCESS
+                if future:
+                    # the pages of the oldest window are handed on as they arrive, until the worker ends them with None
+                    while True:
+                        try:
+                            response = window_pages.get(timeout=ELASTICSEARCH_QUEUE_POLL_INTERVAL)
+                        except queue.Empty:
+                            if not future.done():
+                                continue
+                            response = None
+                        if response is None:
+                            break
+                        yield RetVal(phantom.APP_SUCCESS, (window, hits, response))
+
+                    try:
+                        ret_val = future.result()
+                    except Exception as e:
+                        error_message = self._get_error_message_from_exception(e)
+                        ret_val = window_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_SERVER_MESSAGE, error_message)
+
+                if phantom.is_fail(ret_val):
+                    yield RetVal(action_result.set_status(phantom.APP_ERROR, window_result.get_message()), None)
+                    return
+
+                yield RetVal(phantom.APP_SUCCESS, (window, hits, None))
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _fetch_window(self, action_result, index, body, params, search_params, page_size, search_after, pit_id, window_pages, stop):
+        """Worker of _search_windows, puts the pages of the window on the window_pages queue followed by None, returns
+        the status"""
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    window_pages.put(item, timeout=ELASTICSEARCH_QUEUE_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        pages = self._search_pages(
+            action_result,
+            index,
+            body,
+            params=params,
+            search_params=search_params,
+            page_size=page_size,
+            search_after=search_after,
+            use_pit=bool(pit_id),
+            pit_id=pit_id,
+        )
+        try:
+            for ret_val, response in pages:
+                if phantom.is_fail(ret_val):
+                    return action_result.get_status()
+                # the PIT id is an opaque token which is only meaningful while the search is running
+                response.pop("pit_id", None)
+                if not put(response):
+                    break
+        finally:
+            try:
+                pages.close()
+            finally:
+                put(None)
+
+        return phantom.APP_SUCCESS
+
+    def _export_query(self, param):
+        """Action handler for the 'export query' action.
+
+        The query runs on a single point in time which is split in slices, every slice is read by its own worker and
+        written to a gzipped NDJSON file that is added to the vault.
+        """
+
+        import uuid
+        from concurrent.futures import ThreadPoolExecutor
+
+        import phantom.rules as ph_rules
+        from phantom.vault import Vault
+
+        action_result = self.add_action_result(ActionResult(dict(param)))
+
+        query_json = None
+        try:
+            if param.get(ELASTICSEARCH_JSON_QUERY):
+                query_json = json.loads(param.get(ELASTICSEARCH_JSON_QUERY))
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, f"Unable to load query json. Error: {error_message}")
+
+        index = self._parse_index(param.get(ELASTICSEARCH_JSON_INDEX))
+        if not index:
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_ACTION_PARAM.format(key="index"))
+
+        routing = param.get(ELASTICSEARCH_JSON_ROUTING)
+        params = None
+        if routing:
+            params = {"routing": urllib.quote(routing)}
+
+        ret_val, slices = self._validate_integer(
+            action_result, param.get(ELASTICSEARCH_JSON_SLICES, ELASTICSEARCH_DEFAULT_SLICES), ELASTICSEARCH_JSON_SLICES
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+        if slices > ELASTICSEARCH_MAX_EXPORT_SLICES:
+            return action_result.set_status(
+                phantom.APP_ERROR, ELASTICSEARCH_ERROR_MAX_INT.format(key=ELASTICSEARCH_JSON_SLICES, max=ELASTICSEARCH_MAX_EXPORT_SLICES)
+            )
+
+        ret_val, page_size = self._validate_integer(
+            action_result, param.get(ELASTICSEARCH_JSON_PAGE_SIZE, ELASTICSEARCH_DEFAULT_PAGE_SIZE), ELASTICSEARCH_JSON_PAGE_SIZE
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        # Connectivity
+        self.save_progress(phantom.APP_PROG_CONNECTING_TO_ELLIPSES, self._host)
+
+        ret_val, pit_id = self._open_pit(action_result, index, params)
+        if phantom.is_fail(ret_val):
+            self.debug_print(action_result.get_message())
+            return action_result.get_status()
+
+        file_prefix = "elasticsearch_export_{}_{}".format(re.sub(r"[^\w.-]", "_", index), time.strftime("%Y%m%d%H%M%S"))
+        tmp_dir = Vault.get_vault_tmp_dir()
+        start_time = time.monotonic()
+        try:
+            # more slices than workers are read one after the other as the workers free up
+            with ThreadPoolExecutor(max_workers=min(slices, ELASTICSEARCH_MAX_EXPORT_WORKERS)) as executor:
+                futures = [
+                    executor.submit(
+                        self._export_slice,
+                        index,
+                        query_json,
+                        pit_id,
+                        slice_id,
+                        slices,
+                        page_size,
+                        os.path.join(tmp_dir, f"{file_prefix}_{uuid.uuid4().hex}.ndjson.gz"),
+                    )
+                    for slice_id in range(slices)
+                ]
+                slice_results = [future.result() for future in futures]
+        finally:
+            self._close_pit(pit_id)
+
+        elapsed = time.monotonic() - start_time
+
+        total_documents = total_bytes = failed_slices = 0
+        for slice_result in slice_results:
+            path = slice_result.pop("path")
+            if slice_result["status"] == "success":
+                file_name = f"{file_prefix}_slice{slice_result['slice']}.ndjson.gz"
+                success, message, vault_id = ph_rules.vault_add(container=self.get_container_id(), file_location=path, file_name=file_name)
+                if success:
+                    slice_result.update({"vault_id": vault_id, "file_name": file_name})
+                else:
+                    slice_result.update({"status": "failed", "message": f"Unable to add the export file to the vault: {message}"})
+
+            if os.path.exists(path):
+                os.remove(path)
+
+            if slice_result["status"] == "success":
+                total_documents += slice_result["documents"]
+                total_bytes += slice_result["bytes"]
+            else:
+                failed_slices += 1
+
+            action_result.add_data(slice_result)
+
+        action_result.update_summary(
+            {
+                ELASTICSEARCH_JSON_TOTAL_DOCUMENTS: total_documents,
+                ELASTICSEARCH_JSON_TOTAL_BYTES: total_bytes,
+                ELASTICSEARCH_JSON_SECONDS: round(elapsed, 3),
+                ELASTICSEARCH_JSON_DOCS_PER_SECOND: round(total_documents / elapsed, 1) if elapsed else total_documents,
+                ELASTICSEARCH_JSON_BYTES_PER_SECOND: round(total_bytes / elapsed, 1) if elapsed else total_bytes,
+                ELASTICSEARCH_JSON_FAILED_SLICES: failed_slices,
+            }
+        )
+
+        if failed_slices:
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_EXPORT_SLICES.format(failed=failed_slices, slices=slices))
+
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _export_slice(self, index, query_json, pit_id, slice_id, slices, page_size, path):
+        """Worker of the 'export query' action, writes one slice of the point in time to a gzipped NDJSON file"""
+
+        import gzip
+
+        # every worker reports its errors on its own action result
+        slice_action_result = ActionResult()
+        body = dict(query_json or {})
+        if slices > 1:
+            body["slice"] = {"id": slice_id, "max": slices}
+
+        documents = written = 0
+        start_time = time.monotonic()
+        status = "success"
+        message = None
+        try:
+            with gzip.open(path, "wt", encoding="utf-8") as export_file:
+                for ret_val, response in self._search_pages(slice_action_result, index, body, page_size=page_size, pit_id=pit_id):
+                    if phantom.is_fail(ret_val):
+                        status, message = "failed", slice_action_result.get_message()
+                        break
+
+                    for hit in response.get("hits", {}).get("hits", []):
+                        # the sort values are only needed for the paging, which still reads them from the page
+                        line = json.dumps({key: value for key, value in hit.items() if key != "sort"}) + "\n"
+                        export_file.write(line)
+                        written += len(line)
+                        documents += 1
+        except Exception as e:
+            status, message = "failed", self._get_error_message_from_exception(e)
+
+        elapsed = time.monotonic() - start_time
+        return {
+            "slice": slice_id,
+            "status": status,
+            "message": message,
+            "documents": documents,
+            "bytes": written,
+            "compressed_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+            "seconds": round(elapsed, 3),
+            "docs_per_second": round(documents / elapsed, 1) if elapsed else documents,
+            "path": path,
+        }
+
+    def _iter_documents(self, source):
+        """Yield the documents of a JSON list or of NDJSON (one document per line) read from a string or file object"""
+
+        if isinstance(source, str):
+            text = source.lstrip()
+            if text.startswith("["):
+                yield from json.loads(text)
+                return
+            lines = text.splitlines()
+        else:
+            first = source.read(1)
+            while first and first.isspace():
+                first = source.read(1)
+            if first == "[":
+                yield from self._iter_json_array(source)
+                return
+            lines = itertools.chain([first + source.readline()], source)
+
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+    def _iter_json_array(self, source):
+        """Yield the items of a JSON list from a file object positioned after its '[', reading it a block at a time.
+
+        Raises ValueError when the file is not a valid JSON list.
+        """
+
+        decoder = json.JSONDecoder()
+        buffer = ""
+        position = 0
+        eof = False
+        # "first": an item or the ']' of an empty list, "item": an item, "separator": ',' or ']'
+        expect = "first"
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    raise ValueError("The JSON list is not terminated")
+                buffer, position, eof = self._read_json_block(source, buffer, position)
+                continue
+
+            char = buffer[position]
+            if expect == "separator" or (expect == "first" and char == "]"):
+                if char == "]":
+                    return
+                if char != ",":
+                    raise ValueError(f"Expecting ',' or ']' in the JSON list, found '{char}'")
+                position += 1
+                expect = "item"
+                continue
+
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+                end = None
+            # the item goes on in the next block, or may be a number cut in the middle, e.g. '6.' of '6.78e10' decodes
+            # as 6, when the characters a number can go on with run to the end of the block
+            if end is None or (NUMBER_TAIL.match(buffer, end).end() == len(buffer) and not eof):
+                buffer, position, eof = self._read_json_block(source, buffer, position)
+                continue
+
+            yield item
+            position = end
+            expect = "separator"
+
+    def _read_json_block(self, source, buffer, position):
+        """Return (buffer, position, end of file) with the consumed start of the buffer dropped and the next block of
+        the file appended, the block is at least as long as what is left so a large item is decoded a few times only"""
+
+        buffer = buffer[position:]
+        block = source.read(max(ELASTICSEARCH_READ_BLOCK_SIZE, len(buffer)))
+        return buffer + block, 0, not block
+
+    def _index_documents(self, param):
+        """Action handler for the 'index documents' action, the documents are streamed to the _bulk API in chunks"""
+
+        action_result = self.add_action_result(ActionResult(dict(param)))
+
+        index = param.get(ELASTICSEARCH_JSON_INDEX, "").strip()
+        if not index or "," in index:
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INVALID_ACTION_PARAM.format(key="index"))
+
+        documents = param.get(ELASTICSEARCH_JSON_DOCUMENTS)
+        vault_id = param.get(ELASTICSEARCH_JSON_VAULT_ID)
+        if bool(documents) == bool(vault_id):
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_DOCUMENTS_SOURCE)
+
+        id_field = param.get(ELASTICSEARCH_JSON_ID_FIELD)
+
+        ret_val, chunk_size = self._validate_integer(
+            action_result, param.get(ELASTICSEARCH_JSON_CHUNK_SIZE, ELASTICSEARCH_DEFAULT_BULK_CHUNK_SIZE), ELASTICSEARCH_JSON_CHUNK_SIZE
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        ret_val, chunk_bytes = self._validate_integer(
+            action_result, param.get(ELASTICSEARCH_JSON_CHUNK_BYTES, ELASTICSEARCH_DEFAULT_BULK_CHUNK_BYTES), ELASTICSEARCH_JSON_CHUNK_BYTES
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        ret_val, max_retries = self._validate_integer(
+            action_result,
+            param.get(ELASTICSEARCH_JSON_MAX_RETRIES, ELASTICSEARCH_DEFAULT_BULK_MAX_RETRIES),
+            ELASTICSEARCH_JSON_MAX_RETRIES,
+            allow_zero=True,
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        source_file = None
+        if vault_id:
+            import phantom.rules as ph_rules
+
+            try:
+                success, message, vault_info = ph_rules.vault_info(vault_id=vault_id)
+                if not success or not vault_info:
+                    return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_VAULT_FILE.format(vault_id=vault_id, error=message))
+                source_file = open(vault_info[0]["path"], encoding="utf-8")
+            except Exception as e:
+                error_message = self._get_error_message_from_exception(e)
+                return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_VAULT_FILE.format(vault_id=vault_id, error=error_message))
+
+        # Connectivity
+        self.save_progress(phantom.APP_PROG_CONNECTING_TO_ELLIPSES, self._host)
+
+        counts = {"indexed": 0, "failed": 0, "retried": 0}
+        errors = []
+        total = 0
+        start_time = time.monotonic()
+        try:
+            chunk = []
+            chunk_length = 0
+            for position, document in enumerate(self._iter_documents(source_file or documents)):
+                total = position + 1
+                if not isinstance(document, dict):
+                    counts["failed"] += 1
+                    if len(errors) < ELASTICSEARCH_MAX_BULK_ERRORS:
+                        errors.append(
+                            {
+                                "position": position,
+                                "id": None,
+                                "status": None,
+                                "type": "invalid_document",
+                                "reason": "The document is not a JSON object",
+                            }
+                        )
+                    continue
+
+                header = {"_index": index}
+                if id_field and document.get(id_field) is not None:
+                    header["_id"] = str(document[id_field])
+                lines = "{}\n{}\n".format(json.dumps({"index": header}), json.dumps(document))
+
+                if chunk and (len(chunk) >= chunk_size or chunk_length + len(lines) > chunk_bytes):
+                    ret_val = self._send_bulk_chunk(action_result, chunk, max_retries, counts, errors)
+                    if phantom.is_fail(ret_val):
+                        # the documents of the earlier chunks are indexed, the summary still tells how many
+                        self._update_bulk_summary(action_result, total, counts, errors, start_time)
+                        return action_result.get_status()
+                    chunk = []
+                    chunk_length = 0
+
+                chunk.append((position, header.get("_id"), lines))
+                chunk_length += len(lines)
+
+            if chunk:
+                ret_val = self._send_bulk_chunk(action_result, chunk, max_retries, counts, errors)
+                if phantom.is_fail(ret_val):
+                    self._update_bulk_summary(action_result, total, counts, errors, start_time)
+                    return action_result.get_status()
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            self._update_bulk_summary(action_result, total, counts, errors, start_time)
+            return action_result.set_status(phantom.APP_ERROR, f"Unable to read the documents. Error: {error_message}")
+        finally:
+            if source_file:
+                source_file.close()
+
+        self._update_bulk_summary(action_result, total, counts, errors, start_time)
+
+        if not counts["indexed"] and counts["failed"]:
+            return action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_BULK_NOTHING_INDEXED)
+
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _update_bulk_summary(self, action_result, total, counts, errors, start_time):
+        """Report the documents read, indexed, failed and retried so far, and the item errors"""
+
+        elapsed = time.monotonic() - start_time
+
+        # only the first ELASTICSEARCH_MAX_BULK_ERRORS item errors are kept, the summary has the full count
+        for error in errors:
+            action_result.add_data(error)
+
+        action_result.update_summary(
+            {
+                ELASTICSEARCH_JSON_TOTAL_DOCUMENTS: total,
+                ELASTICSEARCH_JSON_INDEXED_DOCUMENTS: counts["indexed"],
+                ELASTICSEARCH_JSON_FAILED_DOCUMENTS: counts["failed"],
+                ELASTICSEARCH_JSON_RETRIED_DOCUMENTS: counts["retried"],
+                ELASTICSEARCH_JSON_SECONDS: round(elapsed, 3),
+                ELASTICSEARCH_JSON_DOCS_PER_SECOND: round(counts["indexed"] / elapsed, 1) if elapsed else counts["indexed"],
+            }
+        )
+
+    def _send_bulk_chunk(self, action_result, chunk, max_retries, counts, errors):
+        """Send one chunk of (position, id, action and document lines) to _bulk.
+
+        Only the items rejected with 429 (too many requests) are sent again, with an exponential backoff, the other
+        item errors are added to errors. Returns the status of the request itself.
+        """
+
+        attempt = 0
+        while chunk:
+            ret_val, response = self._make_rest_call(
+                ELASTICSEARCH_BULK,
+                action_result,
+                headers={"Content-Type": "application/x-ndjson"},
+                data="".join(lines for _, _, lines in chunk),
+                method="post",
+                idempotent=False,
+            )
+            if phantom.is_fail(ret_val):
+                self.debug_print(action_result.get_message())
+                return action_result.get_status()
+
+            rejected = []
+            for (position, doc_id, lines), item in zip(chunk, response.get("items", [])):
+                result = next(iter(item.values()), {})
+                status = result.get("status")
+                if status == 429 and attempt < max_retries:
+                    rejected.append((position, doc_id, lines))
+                elif result.get("error") or not status or status >= 300:
+                    error = result.get("error") or {}
+                    counts["failed"] += 1
+                    if len(errors) >= ELASTICSEARCH_MAX_BULK_ERRORS:
+                        continue
+                    errors.append(
+                        {
+                            "position": position,
+                            "id": result.get("_id", doc_id),
+                            "status": status,
+                            "type": error.get("type") if isinstance(error, dict) else None,
+                            "reason": error.get("reason") if isinstance(error, dict) else error,
+                        }
+                    )
+                else:
+                    counts["indexed"] += 1
+
+            if rejected:
+                attempt += 1
+                counts["retried"] += len(rejected)
+                time.sleep(min(ELASTICSEARCH_BULK_BACKOFF_BASE * 2 ** (attempt - 1), ELASTICSEARCH_BULK_BACKOFF_MAX))
+            chunk = rejected
+
+        return phantom.APP_SUCCESS
+
+    def _get_config(self, param):
+        """Action handler for the 'get config' action.
+
+        The cat indices API selects, filters and sorts the columns on the server, the listing is rolled up by health
+        and status and only up to 'limit' rows are returned.
+        """
+
+        action_result = self.add_action_result(ActionResult(dict(param)))
+
+        sort_by = param.get(ELASTICSEARCH_JSON_SORT_BY, ELASTICSEARCH_CAT_INDICES_COLUMNS[0])
+        if sort_by not in ELASTICSEARCH_CAT_INDICES_COLUMNS:
+            return action_result.set_status(
+                phantom.APP_ERROR,
+                ELASTICSEARCH_ERROR_VALUE_LIST.format(key=ELASTICSEARCH_JSON_SORT_BY, values=ELASTICSEARCH_CAT_INDICES_COLUMNS),
+            )
+
+        sort_order = param.get(ELASTICSEARCH_JSON_SORT_ORDER, ELASTICSEARCH_SORT_ORDERS[0])
+        if sort_order not in ELASTICSEARCH_SORT_ORDERS:
+            return action_result.set_status(
+                phantom.APP_ERROR, ELASTICSEARCH_ERROR_VALUE_LIST.format(key=ELASTICSEARCH_JSON_SORT_ORDER, values=ELASTICSEARCH_SORT_ORDERS)
+            )
+
+        ret_val, limit = self._validate_integer(action_result, param.get(ELASTICSEARCH_JSON_LIMIT), ELASTICSEARCH_JSON_LIMIT, allow_zero=True)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        ret_val, cache = self._get_index_list_cache(action_result)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        index_pattern = self._parse_index(param.get(ELASTICSEARCH_JSON_INDEX_PATTERN))
+        endpoint = ELASTICSEARCH_GET_INDEXES
+        if index_pattern:
+            endpoint = ELASTICSEARCH_GET_INDEXES_WITH_PATTERN.format(urllib.quote(index_pattern, safe=",*"))
+        params = {"h": ",".join(ELASTICSEARCH_CAT_INDICES_COLUMNS), "bytes": "b", "s": f"{sort_by}:{sort_order}"}
+
+        response = None
+        if cache:
+            cache_key = cache.make_key(sorted(index_pattern.split(",")), params)
+            with self._timer.phase(ELASTICSEARCH_PHASE_CACHE):
+                response = cache.get(cache_key)
+            action_result.update_summary({ELASTICSEARCH_JSON_CACHE: "hit" if response is not None else "miss"})
+
+        if response is None:
+            # Connectivity
+            self.save_progress(phantom.APP_PROG_CONNECTING_TO_ELLIPSES, self._host)
+
+            # Make the rest endpoint call
+            ret_val, response = self._make_rest_call(endpoint, action_result, params=params)
+
+            # Process errors
+            if phantom.is_fail(ret_val):
+                # Dump error messages in the log
+                self.debug_print(action_result.get_message())
+                return action_result.get_status()
+
+            if cache:
+                with self._timer.phase(ELASTICSEARCH_PHASE_CACHE):
+                    cache.set(cache_key, response)
+
+        by_health = {}
+        by_status = {}
+        total_documents = total_store_bytes = 0
+        for indices in response:
+            by_health[indices.get("health")] = by_health.get(indices.get("health"), 0) + 1
+            by_status[indices.get("status")] = by_status.get(indices.get("status"), 0) + 1
+            # closed indices report no counts
+            total_documents += int(indices.get("docs.count") or 0)
+            total_store_bytes += int(indices.get("store.size") or 0)
+
+        rows = [] if param.get(ELASTICSEARCH_JSON_SUMMARY_ONLY, False) else response
+        if limit is not None:
+            rows = rows[:limit]
+
+        for indices in rows:
+            data = {
+                "index": indices.get("index"),
+                "health": indices.get("health"),
+                "status": indices.get("status"),
+                "document_count": indices.get("docs.count"),
+                "store_size": indices.get("store.size"),
+            }
+            action_result.add_data(data)
+
+        action_result.update_summary(
+            {
+                "total_indices": len(response),
+                ELASTICSEARCH_JSON_RETURNED_INDICES: len(rows),
+                ELASTICSEARCH_JSON_TOTAL_DOCUMENTS: total_documents,
+                ELASTICSEARCH_JSON_TOTAL_STORE_BYTES: total_store_bytes,
+                ELASTICSEARCH_JSON_BY_HEALTH: by_health,
+                ELASTICSEARCH_JSON_BY_STATUS: by_status,
+            }
+        )
+
+        # Set the Status
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _get_index_list_cache(self, action_result):
+        """Return RetVal(status, result cache) for the 'get config' listing, None when it is not enabled on the asset"""
+
+        config = self.get_config()
+        ret_val, ttl = self._validate_integer(
+            action_result,
+            config.get(ELASTICSEARCH_JSON_INDEX_CACHE_TTL, ELASTICSEARCH_DEFAULT_CACHE_TTL),
+            ELASTICSEARCH_JSON_INDEX_CACHE_TTL,
+            allow_zero=True,
+        )
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        if not ttl:
+            return RetVal(phantom.APP_SUCCESS, None)
+
+        directory = os.path.join(self.get_state_dir(), ELASTICSEARCH_INDEX_CACHE_DIR.format(asset_id=self.get_asset_id()))
+        return RetVal(phantom.APP_SUCCESS, ResultCache(directory, ttl, ELASTICSEARCH_INDEX_CACHE_SIZE))
+
+    def _prepare_container(self, container_dict):
+        config = self.get_config()
+        container = container_dict.get("container")
+        container["label"] = config.get("ingest", {}).get("container_label")
+        container["artifacts"] = container_dict.get("artifacts")
+
+        return container
+
+    def _save_containers(self, container_dicts, batch_size, offset=0):
+        with self._timer.phase(ELASTICSEARCH_PHASE_SAVE_CONTAINERS):
+            return self._save_container_batches(container_dicts, batch_size, offset)
+
+    def _save_container_batches(self, container_dicts, batch_size, offset):
+        """Save the parsed containers in chunks of batch_size, returns the number of saved and failed containers.
+
+        Every chunk is a single platform call, a failing chunk is logged and the remaining chunks are still saved.
+        The offset is the number of containers saved earlier in the poll, it is only used in the progress messages.
+        """
+
+        saved = failed = 0
+        for start in range(offset, offset + len(container_dicts), batch_size):
+            chunk = [self._prepare_container(container_dict) for container_dict in container_dicts[start - offset : start - offset + batch_size]]
+            try:
+                ret_val, message, responses = self.save_containers(chunk)
+            except Exception as e:
+                ret_val, message, responses = phantom.APP_ERROR, self._get_error_message_from_exception(e), []
+
+            if phantom.is_fail(ret_val):
+                self.debug_print(f"Unable to save containers {start + 1} to {start + len(chunk)}: {message}")
+                failed += len(chunk)
+                continue
+
+            chunk_saved = 0
+            for container, response in zip(chunk, responses or []):
+                if not response.get("success"):
+                    continue
+                chunk_saved += 1
+                if self._hit_grouper is not None:
+                    self._hit_grouper.record_saved(container.get("source_data_identifier"), len(container.get("artifacts") or []))
+            saved += chunk_saved
+            failed += len(chunk) - chunk_saved
+            self.save_progress(
+                ELASTICSEARCH_SAVE_CONTAINERS_PROGRESS.format(
+                    first=start + 1, last=start + len(chunk), saved=chunk_saved, failed=len(chunk) - chunk_saved
+                )
+            )
+
+        return saved, failed
+
+    def _get_watermark(self, config, source=None):
+        """Return the sort values of the last ingested hit, if they were stored for the current checkpoint fields.
+
+        Every named ingest source has its own watermark, the single source configured on the asset keeps the original one.
+        """
+
+        if source is None:
+            watermark = self._state.get(ELASTICSEARCH_STATE_WATERMARK)
+        else:
+            watermark = self._state.get(ELASTICSEARCH_STATE_SOURCE_WATERMARKS, {}).get(source)
+        if not watermark:
+            return None
+
+        if watermark.get("timestamp_field") != config.get(ELASTICSEARCH_JSON_TIMESTAMP_FIELD):
+            self.save_progress("Ingestion checkpoint fields changed, ignoring the stored watermark")
+            return None
+
+        if watermark.get("tiebreaker_field") != config.get(ELASTICSEARCH_JSON_TIEBREAKER_FIELD):
+            # a checkpoint saved without the tiebreaker, or with another one, still tells the time to resume from
+            self.save_progress("Ingestion tiebreaker field changed, resuming from the timestamp of the stored watermark")
+            return (watermark.get("sort") or [])[:1] or None
+
+        return watermark.get("sort")
+
+    def _set_watermark(self, config, sort_values, source=None):
+        watermark = {
+            "timestamp_field": config.get(ELASTICSEARCH_JSON_TIMESTAMP_FIELD),
+            "tiebreaker_field": config.get(ELASTICSEARCH_JSON_TIEBREAKER_FIELD),
+            "sort": sort_values,
+        }
+        if source is None:
+            self._state[ELASTICSEARCH_STATE_WATERMARK] = watermark
+        else:
+            self._state.setdefault(ELASTICSEARCH_STATE_SOURCE_WATERMARKS, {})[source] = watermark
+
+    def _get_ingest_range(self, config, param, source=None):
+        """Return (watermark, start, end) of the poll, the times are epoch milliseconds or None if the range is open"""
+
+        # a manual poll ingests the requested range, only scheduled polls continue from the checkpoint
+        watermark = None if self.is_poll_now() else self._get_watermark(config, source)
+        start = watermark[0] if watermark else param.get(ELASTICSEARCH_JSON_START_TIME)
+        return watermark, start, param.get(ELASTICSEARCH_JSON_END_TIME)
+
+    def _get_ingest_windows(self, config, param, source=None):
+        """The [start, end) range of epoch milliseconds to search in time windows, None unless the poll has a start"""
+
+        if not config.get(ELASTICSEARCH_JSON_TIMESTAMP_FIELD):
+            return None
+
+        _, start, end = self._get_ingest_range(config, param, source)
+        if not start:
+            return None
+
+        return int(start), int(end or time.time() * 1000) + 1
+
+    def _build_ingest_query(self, config, param, source=None):
+        """Add the checkpoint range filter and sort to the ingest query, returns RetVal(status, query json).
+
+        Without a configured timestamp field the ingest query is used as is.
+        """
+
+        try:
+            query_json = json.loads(config["ingest_query"])
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return RetVal(self.set_status(phantom.APP_ERROR, f"Unable to load query json. Error: {error_message}"), None)
+
+        timestamp_field = config.get(ELASTICSEARCH_JSON_TIMESTAMP_FIELD)
+        if not timestamp_field:
+            return RetVal(phantom.APP_SUCCESS, query_json)
+
+        # the sort must be unique, otherwise more hits than a page on the checkpoint timestamp are never got past
+        tiebreaker_field = config.get(ELASTICSEARCH_JSON_TIEBREAKER_FIELD)
+        if not tiebreaker_field:
+            return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_TIEBREAKER_REQUIRED), None)
+
+        watermark, start, end = self._get_ingest_range(config, param, source)
+
+        time_range = {"format": "epoch_millis"}
+        if start:
+            time_range["gte"] = start
+        if end:
+            time_range["lte"] = end
+
+        filters = [{"range": {timestamp_field: time_range}}]
+        if query_json.get("query"):
+            filters.insert(0, query_json["query"])
+        query_json["query"] = {"bool": {"filter": filters}}
+
+        query_json["sort"] = [{timestamp_field: "asc"}, {tiebreaker_field: "asc"}]
+        # hits on the checkpoint timestamp which were already ingested are skipped by the tiebreaker, a checkpoint
+        # without one only gives the start of the range
+        if watermark and len(watermark) == len(query_json["sort"]):
+            query_json["search_after"] = watermark
+
+        return RetVal(phantom.APP_SUCCESS, query_json)
+
+    def _get_seen_index(self, action_result, config):
+        """Return RetVal(status, index of the ingested hits), the index is None when it is not enabled on the asset.
+
+        Manual polls ingest whatever they are asked for, only scheduled polls skip and remember the ingested hits.
+        """
+
+        ret_val, hours = self._validate_integer(
+            action_result,
+            config.get(ELASTICSEARCH_JSON_DEDUP_HOURS, ELASTICSEARCH_DEFAULT_DEDUP_HOURS),
+            ELASTICSEARCH_JSON_DEDUP_HOURS,
+            allow_zero=True,
+        )
+        if phantom.is_fail(ret_val):
+            return RetVal(action_result.get_status(), None)
+
+        if not hours or self.is_poll_now():
+            return RetVal(phantom.APP_SUCCESS, None)
+
+        # one more generation than the retention is split into, so a hit is remembered for at least the retention
+        path = os.path.join(self.get_state_dir(), ELASTICSEARCH_DEDUP_FILE.format(asset_id=self.get_asset_id()))
+        seen_index = SeenIndex(
+            path, hours * 3600 // ELASTICSEARCH_DEDUP_GENERATIONS, ELASTICSEARCH_DEDUP_GENERATIONS + 1, ELASTICSEARCH_DEDUP_MAX_ENTRIES
+        )
+        return RetVal(phantom.APP_SUCCESS, seen_index)
+
+    def _load_ingest_parser(self, config):
+        """Compile the custom ingest parser once, returns RetVal(status, parser function).
+
+        Falls back to the default parser when no custom parser is configured, bound to the field map of the asset.
+        """
+
+        parser = config.get("ingest_parser")
+        if not parser:
+            return self._load_default_parser(config)
+
+        parser_name = config.get("ingest_parser__filename", MODULE_NAME)
+        self.save_progress(f"Using specified parser: {parser_name}")
+
+        source_hash = hashlib.sha256(parser.encode("utf-8")).hexdigest()
+        module = PARSER_CACHE.get(source_hash)
+        if module is None:
+            saved_stdout = sys.stdout
+            try:
+                sys.stdout = PhantomDebugWriter(self)
+                code = compile(parser, parser_name, "exec")
+                module = importlib.util.module_from_spec(importlib.util.spec_from_loader(MODULE_NAME, loader=None))
+                exec(code, module.__dict__)
+            except Exception as e:
+                error_message = self._get_error_message_from_exception(e)
+                return RetVal(self.set_status(phantom.APP_ERROR, f"Unable to load ingest parser: {error_message}"), None)
+            finally:
+                sys.stdout = saved_stdout
+
+            if not callable(getattr(module, "ingest_parser", None)):
+                return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_PARSER_FUNCTION.format(parser_name=parser_name)), None)
+
+            PARSER_CACHE[source_hash] = module
+
+        return RetVal(phantom.APP_SUCCESS, module.ingest_parser)
+
+    def _load_default_parser(self, config):
+        """Compile the field map and the grouping once for the whole poll, returns RetVal(status, default parser using them)"""
+
+        field_map = None
+        field_map_json = config.get(ELASTICSEARCH_JSON_FIELD_MAP)
+        if field_map_json:
+            try:
+                field_map = compile_field_map(field_map_json)
+            except Exception as e:
+                error_message = self._get_error_message_from_exception(e)
+                return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_FIELD_MAP.format(error=error_message)), None)
+
+        ret_val, grouper = self._get_hit_grouper(config)
+        if phantom.is_fail(ret_val):
+            return RetVal(ret_val, None)
+
+        if field_map is None and grouper is None:
+            return RetVal(phantom.APP_SUCCESS, elasticsearch_parser.ingest_parser)
+
+        return RetVal(phantom.APP_SUCCESS, functools.partial(elasticsearch_parser.ingest_parser, field_map=field_map, grouper=grouper))
+
+    def _get_hit_grouper(self, config):
+        """Return RetVal(status, grouper of the hits into containers), None unless the asset groups the hits"""
+
+        group_by = [field.strip() for field in (config.get(ELASTICSEARCH_JSON_GROUP_BY) or "").split(",") if field.strip()]
+        if not group_by:
+            return RetVal(phantom.APP_SUCCESS, None)
+
+        settings = {}
+        for key, default, allow_zero in (
+            (ELASTICSEARCH_JSON_GROUP_BUCKET, ELASTICSEARCH_DEFAULT_GROUP_BUCKET, True),
+            (ELASTICSEARCH_JSON_GROUP_MAX_ARTIFACTS, ELASTICSEARCH_DEFAULT_GROUP_MAX_ARTIFACTS, False),
+        ):
+            ret_val, settings[key] = self._validate_integer(self, config.get(key, default), key, allow_zero)
+            if phantom.is_fail(ret_val):
+                return RetVal(ret_val, None)
+
+        grouper = HitGrouper(
+            group_by,
+            bucket_seconds=settings[ELASTICSEARCH_JSON_GROUP_BUCKET],
+            time_field=config.get(ELASTICSEARCH_JSON_TIMESTAMP_FIELD) or ELASTICSEARCH_DEFAULT_TIMESTAMP_FIELD,
+            max_artifacts=settings[ELASTICSEARCH_JSON_GROUP_MAX_ARTIFACTS],
+            saved_counts={group_id: entry[0] for group_id, entry in self._state.get(ELASTICSEARCH_STATE_GROUP_COUNTS, {}).items()},
+        )
+        # the counts of the groups are saved after the poll, so the next one keeps the containers under the cap
+        self._hit_grouper = grouper
+        return RetVal(phantom.APP_SUCCESS, grouper)
+
+    def _save_group_counts(self):
+        """Keep the number of hits stored in the containers of the groups in the app state, only the most recently
+        stored groups are kept. A manual poll ingests a range of its own, its containers do not count for the next
+        scheduled polls."""
+
+        if self._hit_grouper is None or self.is_poll_now():
+            return
+
+        now = int(time.time())
+        saved = dict(self._state.get(ELASTICSEARCH_STATE_GROUP_COUNTS, {}))
+        saved.update({group_id: [count, now] for group_id, count in self._hit_grouper.counts().items()})
+        if len(saved) > ELASTICSEARCH_MAX_GROUP_COUNTS:
+            saved = dict(sorted(saved.items(), key=lambda item: item[1][1])[-ELASTICSEARCH_MAX_GROUP_COUNTS:])
+        self._state[ELASTICSEARCH_STATE_GROUP_COUNTS] = saved
+
+    def _get_ingest_sources(self, config):
+        """Return RetVal(status, ingest sources), each a dict with the source name and the asset config to ingest it with.
+
+        Without 'ingest_sources' the index, query and routing of the asset are the only source, its name is None.
+        """
+
+        sources_json = config.get(ELASTICSEARCH_JSON_INGEST_SOURCES)
+        if not sources_json:
+            if not all(field in config for field in self.REQUIRED_INGESTION_FIELDS):
+                return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ON_POLL_ERROR_MESSAGE), None)
+            return RetVal(phantom.APP_SUCCESS, [{"name": None, "config": config}])
+
+        try:
+            entries = json.loads(sources_json)
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INGEST_SOURCES, error_message), None)
+
+        if not isinstance(entries, list) or not entries:
+            return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INGEST_SOURCES), None)
+
+        sources = []
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not isinstance(entry.get("index"), str) or not entry["index"].strip():
+                return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INGEST_SOURCE.format(key="index", position=position)), None)
+            # an empty query object is a valid match all query, a string is the JSON of the query
+            if not isinstance(entry.get("query"), (dict, str)):
+                return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INGEST_SOURCE.format(key="query", position=position)), None)
+            for key in ("routing", ELASTICSEARCH_JSON_TIMESTAMP_FIELD, ELASTICSEARCH_JSON_TIEBREAKER_FIELD):
+                if entry.get(key) is not None and not isinstance(entry[key], str):
+                    return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INGEST_SOURCE.format(key=key, position=position)), None)
+
+            name = str(entry.get("name") or entry["index"])
+            if any(source["name"] == name for source in sources):
+                return RetVal(self.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_INGEST_SOURCE.format(key="name", position=position)), None)
+
+            query = entry["query"] if isinstance(entry["query"], str) else json.dumps(entry["query"])
+            source_config = dict(config, ingest_index=entry["index"], ingest_query=query, ingest_routing=entry.get("routing"))
+            # the checkpoint fields default to the ones of the asset
+            for key in (ELASTICSEARCH_JSON_TIMESTAMP_FIELD, ELASTICSEARCH_JSON_TIEBREAKER_FIELD):
+                if key in entry:
+                    source_config[key] = entry[key]
+            sources.append({"name": name, "config": source_config})
+
+        return RetVal(phantom.APP_SUCCESS, sources)
+
+    def _on_poll(self, param):
+        container_count = param.get("container_count", 0)
+
+        config = self.get_config()
+        ret_val, sources = self._get_ingest_sources(config)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        ret_val, batch_size = self._validate_integer(
+            self, config.get(ELASTICSEARCH_JSON_BATCH_SIZE, ELASTICSEARCH_DEFAULT_BATCH_SIZE), ELASTICSEARCH_JSON_BATCH_SIZE
+        )
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        # a broken parser fails the poll before any data is fetched
+        ret_val, ingest_parser = self._load_ingest_parser(config)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        # wide ranges, e.g. a backfill, are searched in adaptive time windows instead of a single search
+        window_settings = None
+        if config.get(ELASTICSEARCH_JSON_INGEST_SHARDING, False):
+            ret_val, window_settings = self._get_window_settings(self)
+            if phantom.is_fail(ret_val):
+                return ret_val
+
+        for source in sources:
+            ret_val, source["query_json"] = self._build_ingest_query(source["config"], param, source["name"])
+            if phantom.is_fail(ret_val):
+                return ret_val
+            source["windows"] = self._get_ingest_windows(source["config"], param, source["name"]) if window_settings else None
+            source["window_settings"] = window_settings
+
+        ret_val, page_size = self._validate_integer(
+            self, config.get(ELASTICSEARCH_JSON_INGEST_PAGE_SIZE, ELASTICSEARCH_DEFAULT_PAGE_SIZE), ELASTICSEARCH_JSON_INGEST_PAGE_SIZE
+        )
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        ret_val, queue_size = self._validate_integer(
+            self, config.get(ELASTICSEARCH_JSON_QUEUE_SIZE, ELASTICSEARCH_DEFAULT_QUEUE_SIZE), ELASTICSEARCH_JSON_QUEUE_SIZE
+        )
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        ret_val, concurrency = self._validate_integer(
+            self,
+            config.get(ELASTICSEARCH_JSON_INGEST_CONCURRENCY, ELASTICSEARCH_DEFAULT_INGEST_CONCURRENCY),
+            ELASTICSEARCH_JSON_INGEST_CONCURRENCY,
+        )
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        action_result = self.add_action_result(ActionResult(dict(param)))
+
+        # hits ingested by an earlier, overlapping poll are dropped before they are parsed and saved
+        ret_val, seen_index = self._get_seen_index(action_result, config)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        if len(sources) == 1:
+            self.save_progress("Quering data for {} index".format(sources[0]["config"]["ingest_index"]))
+        else:
+            self.save_progress(f"Quering data for {len(sources)} ingest sources")
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        # fetch -> parse -> save pipeline, the sources are fetched concurrently on a bounded pool while the pages already
+        # fetched are parsed and saved here, the bounded queue keeps at most queue_size pages in memory
+        pages = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        for source in sources:
+            # every source reports its errors on its own action result, a failing source does not stop the others
+            source["action_result"] = ActionResult()
+            source["stop"] = threading.Event()
+            source["containers"] = []
+            source["new_keys"] = []
+            source["last_sort"] = None
+            source["offset"] = 0
+            source["finished"] = False
+            source["result"] = {
+                ELASTICSEARCH_JSON_SOURCE: source["name"],
+                ELASTICSEARCH_JSON_INDEX: source["config"]["ingest_index"],
+                ELASTICSEARCH_JSON_STATUS: "success",
+                ELASTICSEARCH_JSON_TOTAL_HITS: 0,
+                ELASTICSEARCH_JSON_RETURNED_HITS: 0,
+                ELASTICSEARCH_JSON_CONTAINERS_SAVED: 0,
+                ELASTICSEARCH_JSON_CONTAINERS_FAILED: 0,
+                ELASTICSEARCH_JSON_SECONDS: None,
+            }
+            if seen_index is not None:
+                source["result"][ELASTICSEARCH_JSON_DUPLICATES_SKIPPED] = 0
+        sources_by_name = {source["name"]: source for source in sources}
+
+        limit = container_count if container_count and self.is_poll_now() else None
+        accepted = 0
+        running = len(sources)
+        executor = ThreadPoolExecutor(max_workers=min(concurrency, len(sources)))
+        try:
+            for source in sources:
+                source["future"] = executor.submit(self._fetch_ingest_source, source, page_size, pages, stop)
+
+            while running:
+                # time spent here means parsing and saving outpace the fetching
+                with self._timer.phase(ELASTICSEARCH_PHASE_QUEUE_WAIT):
+                    try:
+                        name, item = pages.get(timeout=ELASTICSEARCH_QUEUE_POLL_INTERVAL)
+                    except queue.Empty:
+                        running -= self._reap_ingest_workers(sources, pages)
+                        continue
+
+                source = sources_by_name[name]
+                result = source["result"]
+                if source["stop"].is_set():
+                    # the source already failed, whatever it still had queued is dropped
+                    continue
+
+                if item is None:
+                    source["finished"] = True
+                    running -= 1
+                    continue
+
+                ret_val, data = item
+                if phantom.is_fail(ret_val):
+                    self._fail_ingest_source(source, source["action_result"].get_message())
+                    running -= 1
+                    continue
+
+                hits = data.get("hits", {}).get("hits", [])
+                # only the first page of a search, or of every time window, carries the total
+                result[ELASTICSEARCH_JSON_TOTAL_HITS] += data.get("hits", {}).get("total", {}).get("value", 0)
+                result[ELASTICSEARCH_JSON_RETURNED_HITS] += len(hits)
+
+                page_keys = []
+                if seen_index is not None:
+                    keys = [SeenIndex.make_key(hit.get("_index"), hit.get("_id")) for hit in hits]
+                    fresh = [(key, hit) for key, hit in zip(keys, hits) if key not in seen_index]
+                    result[ELASTICSEARCH_JSON_DUPLICATES_SKIPPED] += len(hits) - len(fresh)
+                    page_keys = [key for key, _ in fresh]
+                    data["hits"]["hits"] = [hit for _, hit in fresh]
+
+                ret_dict_list = []
+                if seen_index is None or page_keys:
+                    saved_stdout = sys.stdout
+                    try:
+                        # anything printed by the parser goes to the debug log
+                        sys.stdout = PhantomDebugWriter(self)
+                        with self._timer.phase(ELASTICSEARCH_PHASE_PARSE):
+                            ret_dict_list = ingest_parser(data) or []
+                    except Exception as e:
+                        error_message = self._get_error_message_from_exception(e)
+                        self._fail_ingest_source(source, f"Unable to execute ingest parser: {error_message}")
+                        running -= 1
+                        continue
+                    finally:
+                        sys.stdout = saved_stdout
+
+                # the page is parsed, a failure from here on resumes after it
+                if hits:
+                    source["last_sort"] = hits[-1].get("sort")
+                source["new_keys"].extend(page_keys)
+
+                if limit and accepted + len(ret_dict_list) >= limit:
+                    source["containers"].extend(ret_dict_list[: limit - accepted])
+                    break
+                accepted += len(ret_dict_list)
+                source["containers"].extend(ret_dict_list)
+
+                # save every complete batch right away, only the remainder is carried over to the next page
+                self._save_source_containers(source, batch_size, full_batches_only=True)
+        finally:
+            stop.set()
+            executor.shutdown(wait=True)
+
+        for source in sources:
+            self._save_source_containers(source, batch_size)
+        self._save_group_counts()
+
+        failed_sources = []
+        for source in sources:
+            result = source["result"]
+            action_result.add_data(result)
+            if result[ELASTICSEARCH_JSON_STATUS] != "success":
+                failed_sources.append(str(source["name"] or source["config"]["ingest_index"]))
+
+            # only move the checkpoint forward once everything up to it was saved, failed hits are fetched again next poll;
+            # the pages arrive in checkpoint order, so a failed source still resumes after the last page it parsed
+            if result[ELASTICSEARCH_JSON_CONTAINERS_FAILED]:
+                continue
+            if source["config"].get(ELASTICSEARCH_JSON_TIMESTAMP_FIELD) and source["last_sort"] and not self.is_poll_now():
+                self._set_watermark(source["config"], source["last_sort"], source["name"])
+            if seen_index is not None:
+                seen_index.add(source["new_keys"])
+
+        summary = {
+            key: sum(source["result"][key] for source in sources)
+            for key in (
+                ELASTICSEARCH_JSON_TOTAL_HITS,
+                ELASTICSEARCH_JSON_RETURNED_HITS,
+                ELASTICSEARCH_JSON_CONTAINERS_SAVED,
+                ELASTICSEARCH_JSON_CONTAINERS_FAILED,
+            )
+        }
+        summary[ELASTICSEARCH_JSON_FAILED_SOURCES] = len(failed_sources)
+        action_result.update_summary(summary)
+
+        if seen_index is not None:
+            action_result.update_summary(
+                {ELASTICSEARCH_JSON_DUPLICATES_SKIPPED: sum(source["result"][ELASTICSEARCH_JSON_DUPLICATES_SKIPPED] for source in sources)}
+            )
+            try:
+                seen_index.save()
+            except Exception as e:
+                self.debug_print(f"Unable to save the ingested hits index: {self._get_error_message_from_exception(e)}")
+
+        if failed_sources:
+            if len(sources) == 1:
+                return action_result.set_status(phantom.APP_ERROR, sources[0]["result"][ELASTICSEARCH_JSON_MESSAGE])
+            return action_result.set_status(
+                phantom.APP_ERROR,
+                ELASTICSEARCH_ERROR_INGEST_FAILED_SOURCES.format(
+                    failed=len(failed_sources), sources=len(sources), names=", ".join(failed_sources)
+                ),
+            )
+
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _fail_ingest_source(self, source, message):
+        """Stop ingesting a source, the containers it already produced are still saved"""
+
+        source["stop"].set()
+        source["finished"] = True
+        source["result"][ELASTICSEARCH_JSON_STATUS] = "failed"
+        source["result"][ELASTICSEARCH_JSON_MESSAGE] = message
+        self.debug_print(f"Ingestion of {source['name'] or source['config']['ingest_index']} failed: {message}")
+
+    def _reap_ingest_workers(self, sources, pages):
+        """Fail the sources whose worker ended without queuing its last item, returns how many there were"""
+
+        reaped = 0
+        for source in sources:
+            future = source["future"]
+            if source["finished"] or not future.done():
+                continue
+            # everything a worker puts is queued before it is done, a source may still have items waiting
+            if not pages.empty():
+                break
+            error = future.exception()
+            message = self._get_error_message_from_exception(error) if error else "the fetching stopped without a result"
+            self._fail_ingest_source(source, f"Unable to fetch the ingest source: {message}")
+            reaped += 1
+
+        return reaped
+
+    def _save_source_containers(self, source, batch_size, full_batches_only=False):
+        """Save the parsed containers of a source, keeping the last incomplete batch when full_batches_only is set"""
+
+        containers = source["containers"] = self._merge_containers(source["containers"])
+        count = len(containers) - len(containers) % batch_size if full_batches_only else len(containers)
+        if not count:
+            return
+
+        saved, failed = self._save_containers(containers[:count], batch_size, source["offset"])
+        source["result"][ELASTICSEARCH_JSON_CONTAINERS_SAVED] += saved
+        source["result"][ELASTICSEARCH_JSON_CONTAINERS_FAILED] += failed
+        source["offset"] += count
+        source["containers"] = containers[count:]
+
+    def _merge_containers(self, container_dicts):
+        """Merge the parsed containers which share a source data identifier into the first of them.
+
+        The groups of the default parser which continue on the next page are then saved once. The automation runs
+        for the last artifact which asks for it.
+        """
+
+        merged = {}
+        result = []
+        for container_dict in container_dicts:
+            identifier = (container_dict.get("container") or {}).get("source_data_identifier")
+            existing = merged.get(identifier) if identifier else None
+            if existing is None:
+                if identifier:
+                    merged[identifier] = container_dict
+                result.append(container_dict)
+                continue
+
+            artifacts = container_dict.get("artifacts") or []
+            if any(artifact.get("run_automation") for artifact in artifacts):
+                for artifact in existing.get("artifacts") or []:
+                    artifact["run_automation"] = False
+            existing.setdefault("artifacts", []).extend(artifacts)
+
+        return result
+
+    def _fetch_ingest_source(self, source, page_size, pages, stop):
+        """Worker of the ingest pool, fetches the pages of one source and records how long it took"""
+
+        start = time.perf_counter()
+        try:
+            self._fetch_ingest_pages(source, page_size, pages, stop)
+        finally:
+            source["result"][ELASTICSEARCH_JSON_SECONDS] = round(time.perf_counter() - start, 3)
+
+    def _fetch_ingest_pages(self, source, page_size, pages, stop):
+        """Producer of the ingest pipeline, puts (source name, RetVal(status, search response)) items on the pages queue.
+
+        A None item marks the end of the results of the source, so does a failed one. The fetching stops early once the
+        stop event of the poll, or of the source, is set.
+        """
+
+        action_result = source["action_result"]
+
+        def put(item):
+            while not stop.is_set() and not source["stop"].is_set():
+                try:
+                    pages.put((source["name"], item), timeout=ELASTICSEARCH_QUEUE_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        # the source always ends with a last item, its failure or None, the poll waits for it
+        last_item = None
+        page_iter = None
+        try:
+            config = source["config"]
+            query_json = source["query_json"]
+            index = self._parse_index(config["ingest_index"])
+            params = None
+            if config.get("ingest_routing"):
+                params = {"routing": urllib.quote(config["ingest_routing"])}
+
+            if source["windows"]:
+                # the windows are fetched concurrently but delivered in order, so the checkpoint still only moves forward
+                target_hits, concurrency = source["window_settings"]
+                page_iter = self._iter_window_pages(
+                    self._search_windows(
+                        action_result,
+                        index,
+                        query_json,
+                        config[ELASTICSEARCH_JSON_TIMESTAMP_FIELD],
+                        *source["windows"],
+                        target_hits,
+                        concurrency,
+                        params=params,
+                        page_size=page_size,
+                    )
+                )
+            elif config.get(ELASTICSEARCH_JSON_TIMESTAMP_FIELD):
+                # the checkpoint sort ends with the required tiebreaker, so it is unique and the pages can be walked with
+                # search_after without a point in time
+                page_iter = self._search_pages(action_result, index, query_json, params=params, page_size=page_size, use_pit=False)
+            else:
+                # without a checkpoint field the ingest query is sent as is, in a single request
+                page_iter = iter(
+                    [
+                        self._make_rest_call(
+                            ELASTICSEARCH_QUERY_SEARCH_WITH_INDEX.format(index), action_result, json=query_json, params=params, method="post"
+                        )
+                    ]
+                )
+
+            for ret_val, response in page_iter:
+                if phantom.is_fail(ret_val):
+                    last_item = RetVal(ret_val, response)
+                    return
+                if not put(RetVal(ret_val, response)):
+                    return
+        except Exception as e:
+            error_message = self._get_error_message_from_exception(e)
+            last_item = RetVal(action_result.set_status(phantom.APP_ERROR, ELASTICSEARCH_ERROR_SERVER_MESSAGE, error_message), None)
+        finally:
+            try:
+                if hasattr(page_iter, "close"):
+                    page_iter.close()
+            finally:
+                put(last_item)
+
+    def _iter_window_pages(self, windows):
+        """Turn the items of _search_windows into RetVal(status, search response) pages"""
+
+        try:
+            for ret_val, result in windows:
+                if phantom.is_fail(ret_val):
+                    yield RetVal(ret_val, None)
+                    return
+                if result[2] is not None:
+                    yield RetVal(phantom.APP_SUCCESS, result[2])
+        finally:
+            windows.close()
+
+    def handle_action(self, param):
+        """Function that handles all the actions"""
+
+        # Get the action that we are supposed to carry out, set it in the connection result object
+        action = self.get_action_identifier()
+
+        # Intialize it to success
+        ret_val = phantom.APP_SUCCESS
+
+        # Bunch if if..elif to process actions
+        if action == self.ACTION_ID_RUN_QUERY:
+            ret_val = self._run_query(param)
+        elif action == self.ACTION_ID_RUN_MULTI_QUERY:
+            ret_val = self._run_multi_query(param)
+        elif action == self.ACTION_ID_RUN_AGGREGATION:
+            ret_val = self._run_aggregation(param)
+        elif action == self.ACTION_ID_EXPORT_QUERY:
+            ret_val = self._export_query(param)
+        elif action == self.ACTION_ID_INDEX_DOCUMENTS:
+            ret_val = self._index_documents(param)
+        elif action == self.ACTION_ID_GET_CONFIG:
+            ret_val = self._get_config(param)
+        elif action == phantom.ACTION_ID_TEST_ASSET_CONNECTIVITY:
+            ret_val = self._test_connectivity(param)
+        elif action == phantom.ACTION_ID_INGEST_ON_POLL:
+            ret_val = self._on_poll(param)
+
+        self._report_timings(action)
+
+        return ret_val
+
+    def _report_timings(self, action):
+        """Add the phase timings to the summary of every action result, and to the debug log"""
+
+        timings = self._timer.summary()
+        for action_result in self.get_action_results():
+            action_result.update_summary({ELASTICSEARCH_JSON_TIMINGS: timings})
+
+        self.debug_print(
+            ELASTICSEARCH_TIMINGS_MESSAGE.format(action=action), dump_object={"timings_ms": timings, "counts": self._timer.counts()}
+        )
+
+        container_id = self.get_container_id()
+        if not self._timer.tracing or not container_id:
+            return
+
+        import uuid
+
+        import phantom.rules as ph_rules
+        from phantom.vault import Vault
+
+        # the per call trace is too large for the summary, it goes to the vault of the container instead
+        file_name = f"elasticsearch_{action}_trace_{time.strftime('%Y%m%d%H%M%S')}.json"
+        path = os.path.join(Vault.get_vault_tmp_dir(), f"{uuid.uuid4().hex}_{file_name}")
+        try:
+            with open(path, "w") as f:
+                json.dump({"action": action, "timings_ms": timings, "counts": self._timer.counts(), "calls": self._timer.trace}, f)
+            success, message, _ = ph_rules.vault_add(container=container_id, file_location=path, file_name=file_name)
+            if not success:
+                self.debug_print(f"Unable to add the timing trace to the vault: {message}")
+        except Exception as e:
+            self.debug_print(f"Unable to write the timing trace: {self._get_error_message_from_exception(e)}")
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
 
 
 def main():
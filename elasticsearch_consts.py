@@ -19,12 +19,118 @@ ELASTICSEARCH_JSON_TYPE = "type"
 ELASTICSEARCH_JSON_ROUTING = "routing"
 ELASTICSEARCH_JSON_TOTAL_HITS = "total_hits"
 ELASTICSEARCH_JSON_TIMED_OUT = "timed_out"
+ELASTICSEARCH_JSON_PAGINATE = "paginate"
+ELASTICSEARCH_JSON_PAGE_SIZE = "page_size"
+ELASTICSEARCH_JSON_MAX_HITS = "max_hits"
+ELASTICSEARCH_JSON_SOURCE_INCLUDES = "source_includes"
+ELASTICSEARCH_JSON_SOURCE_EXCLUDES = "source_excludes"
+ELASTICSEARCH_JSON_FILTER_PATH = "filter_path"
+ELASTICSEARCH_JSON_TRACK_TOTAL_HITS = "track_total_hits"
+ELASTICSEARCH_JSON_SUMMARY_ONLY = "summary_only"
+ELASTICSEARCH_JSON_TOOK = "took"
+ELASTICSEARCH_JSON_QUERIES = "queries"
+ELASTICSEARCH_JSON_MAX_CONCURRENT_SEARCHES = "max_concurrent_searches"
+ELASTICSEARCH_JSON_TOTAL_QUERIES = "total_queries"
+ELASTICSEARCH_JSON_SUCCESSFUL_QUERIES = "successful_queries"
+ELASTICSEARCH_JSON_FAILED_QUERIES = "failed_queries"
+ELASTICSEARCH_JSON_SLICES = "slices"
+ELASTICSEARCH_JSON_TOTAL_DOCUMENTS = "total_documents"
+ELASTICSEARCH_JSON_TOTAL_BYTES = "total_bytes"
+ELASTICSEARCH_JSON_SECONDS = "seconds"
+ELASTICSEARCH_JSON_STATUS = "status"
+ELASTICSEARCH_JSON_MESSAGE = "message"
+ELASTICSEARCH_JSON_DOCS_PER_SECOND = "docs_per_second"
+ELASTICSEARCH_JSON_BYTES_PER_SECOND = "bytes_per_second"
+ELASTICSEARCH_JSON_FAILED_SLICES = "failed_slices"
+ELASTICSEARCH_JSON_CACHE = "cache"
+ELASTICSEARCH_JSON_INDEX_PATTERN = "index_pattern"
+ELASTICSEARCH_JSON_SORT_BY = "sort_by"
+ELASTICSEARCH_JSON_SORT_ORDER = "sort_order"
+ELASTICSEARCH_JSON_LIMIT = "limit"
+ELASTICSEARCH_JSON_RETURNED_INDICES = "returned_indices"
+ELASTICSEARCH_JSON_TOTAL_STORE_BYTES = "total_store_bytes"
+ELASTICSEARCH_JSON_BY_HEALTH = "by_health"
+ELASTICSEARCH_JSON_BY_STATUS = "by_status"
+ELASTICSEARCH_JSON_OUTPUT_FORMAT = "output_format"
+ELASTICSEARCH_JSON_MAX_ROWS = "max_rows"
+ELASTICSEARCH_JSON_TOTAL_ROWS = "total_rows"
+ELASTICSEARCH_JSON_RETURNED_ROWS = "returned_rows"
+ELASTICSEARCH_JSON_COLUMNS = "columns"
+ELASTICSEARCH_JSON_DOCUMENTS = "documents"
+ELASTICSEARCH_JSON_VAULT_ID = "vault_id"
+ELASTICSEARCH_JSON_ID_FIELD = "id_field"
+ELASTICSEARCH_JSON_CHUNK_SIZE = "chunk_size"
+ELASTICSEARCH_JSON_CHUNK_BYTES = "chunk_bytes"
+ELASTICSEARCH_JSON_MAX_RETRIES = "max_retries"
+ELASTICSEARCH_JSON_INDEXED_DOCUMENTS = "indexed_documents"
+ELASTICSEARCH_JSON_FAILED_DOCUMENTS = "failed_documents"
+ELASTICSEARCH_JSON_RETRIED_DOCUMENTS = "retried_documents"
+ELASTICSEARCH_JSON_RETURNED_HITS = "returned_hits"
+ELASTICSEARCH_JSON_PAGES = "pages"
+ELASTICSEARCH_JSON_POOL_SIZE = "connection_pool_size"
+ELASTICSEARCH_JSON_KEEP_ALIVE = "keep_alive"
+ELASTICSEARCH_JSON_VERBOSE_DEBUG = "verbose_debug"
+ELASTICSEARCH_JSON_CONNECT_TIMEOUT = "connect_timeout"
+ELASTICSEARCH_JSON_READ_TIMEOUT = "read_timeout"
+ELASTICSEARCH_JSON_REQUEST_RETRIES = "request_retries"
+ELASTICSEARCH_JSON_RETRY_BUDGET = "retry_budget"
+ELASTICSEARCH_JSON_BREAKER_THRESHOLD = "circuit_breaker_threshold"
+ELASTICSEARCH_JSON_BREAKER_COOLDOWN = "circuit_breaker_cooldown"
+ELASTICSEARCH_JSON_TIMING_TRACE = "timing_trace"
+ELASTICSEARCH_JSON_NODE_SELECTOR = "node_selector"
+ELASTICSEARCH_JSON_DEAD_NODE_TIMEOUT = "dead_node_timeout"
+ELASTICSEARCH_JSON_SNIFF_INTERVAL = "sniff_interval"
+ELASTICSEARCH_JSON_TIMINGS = "timings_ms"
+ELASTICSEARCH_JSON_CACHE_TTL = "query_cache_ttl"
+ELASTICSEARCH_JSON_CACHE_SIZE = "query_cache_size"
+ELASTICSEARCH_JSON_INDEX_CACHE_TTL = "index_list_cache_ttl"
+ELASTICSEARCH_JSON_TIMESTAMP_FIELD = "ingest_timestamp_field"
+ELASTICSEARCH_JSON_TIME_FIELD = "time_field"
+ELASTICSEARCH_JSON_START_TIME = "start_time"
+ELASTICSEARCH_JSON_END_TIME = "end_time"
+ELASTICSEARCH_JSON_WINDOW_TARGET_HITS = "window_target_hits"
+ELASTICSEARCH_JSON_WINDOW_CONCURRENCY = "window_concurrency"
+ELASTICSEARCH_JSON_INGEST_SHARDING = "ingest_sharding"
+ELASTICSEARCH_JSON_FIELD_MAP = "ingest_field_map"
+ELASTICSEARCH_JSON_GROUP_BY = "ingest_group_by"
+ELASTICSEARCH_JSON_GROUP_BUCKET = "ingest_group_bucket"
+ELASTICSEARCH_JSON_GROUP_MAX_ARTIFACTS = "ingest_group_max_artifacts"
+ELASTICSEARCH_JSON_WINDOWS = "windows"
+ELASTICSEARCH_JSON_COMPLETED_UNTIL = "completed_until"
+ELASTICSEARCH_JSON_LAST_SORT = "last_sort"
+ELASTICSEARCH_JSON_TIEBREAKER_FIELD = "ingest_tiebreaker_field"
+ELASTICSEARCH_JSON_BATCH_SIZE = "ingest_batch_size"
+ELASTICSEARCH_JSON_INGEST_PAGE_SIZE = "ingest_page_size"
+ELASTICSEARCH_JSON_QUEUE_SIZE = "ingest_queue_size"
+ELASTICSEARCH_JSON_CONTAINERS_SAVED = "containers_saved"
+ELASTICSEARCH_JSON_CONTAINERS_FAILED = "containers_failed"
+ELASTICSEARCH_JSON_DEDUP_HOURS = "ingest_dedup_hours"
+ELASTICSEARCH_JSON_INGEST_SOURCES = "ingest_sources"
+ELASTICSEARCH_JSON_INGEST_CONCURRENCY = "ingest_concurrency"
+ELASTICSEARCH_JSON_SOURCE = "source"
+ELASTICSEARCH_JSON_FAILED_SOURCES = "failed_sources"
+ELASTICSEARCH_JSON_DUPLICATES_SKIPPED = "duplicates_skipped"
+ELASTICSEARCH_STATE_WATERMARK = "watermark"
+ELASTICSEARCH_STATE_SOURCE_WATERMARKS = "source_watermarks"
+ELASTICSEARCH_STATE_CIRCUIT_BREAKER = "circuit_breaker"
+ELASTICSEARCH_STATE_GROUP_COUNTS = "group_counts"
 ELASTICSEARCH_EMPTY_RESPONSE_STATUS_CODES = [200, 204]
+ELASTICSEARCH_SUPPORTED_METHODS = ["get", "post", "put", "delete", "head"]
+ELASTICSEARCH_RETRY_STATUS_CODES = [429, 502, 503, 504]
+# the statuses which guarantee the request was not applied, the only ones a non-idempotent call is retried on
+ELASTICSEARCH_REJECTED_STATUS_CODES = [429, 503]
 
 # endpoints
 ELASTICSEARCH_CLUSTER_HEALTH = "/_cluster/health"
+ELASTICSEARCH_NODES_HTTP = "/_nodes/http"
 ELASTICSEARCH_GET_INDEXES = "/_cat/indices"
+ELASTICSEARCH_GET_INDEXES_WITH_PATTERN = "/_cat/indices/{0}"
 ELASTICSEARCH_QUERY_SEARCH_WITH_INDEX = "/{0}/_search"
+ELASTICSEARCH_QUERY_SEARCH = "/_search"
+ELASTICSEARCH_MULTI_SEARCH = "/_msearch"
+ELASTICSEARCH_BULK = "/_bulk"
+ELASTICSEARCH_OPEN_PIT = "/{0}/_pit"
+ELASTICSEARCH_CLOSE_PIT = "/_pit"
 
 ELASTICSEARCH_ERROR_CONNECTIVITY_TEST = "Test Connectivity Failed"
 ELASTICSEARCH_SUCCESS_CONNECTIVITY_TEST = "Test Connectivity Passed"
@@ -35,6 +141,114 @@ ELASTICSEARCH_ERROR_API_UNSUPPORTED_METHOD = "Unsupported method"
 ELASTICSEARCH_USING_BASE_URL = "Using url: {base_url}"
 ELASTICSEARCH_ERROR_JSON_PARSE = "Unable to parse reply as a Json, raw string reply: '{raw_text}'"
 ELASTICSEARCH_ERROR_MESSAGE_UNAVAILABLE = "Error message unavailable. Please check the asset configuration and|or action parameters"
+ELASTICSEARCH_ERROR_PARSER_FUNCTION = "The ingest parser '{parser_name}' does not define an 'ingest_parser' function"
 ELASTICSEARCH_ON_POLL_ERROR_MESSAGE = "Ingestion requires a configured index and query."
 ELASTICSEARCH_ERROR_INVALID_ACTION_PARAM = "Please provide a valid value in the '{key}' parameter"
+ELASTICSEARCH_ERROR_INVALID_QUERIES = "Please provide a non-empty JSON list of query objects in the 'queries' parameter"
+ELASTICSEARCH_ERROR_INVALID_QUERY_ENTRY = "Please provide a valid '{key}' for the query at position {position} in the 'queries' parameter"
+ELASTICSEARCH_ERROR_EXPORT_SLICES = "Export failed for {failed} of {slices} slices"
+ELASTICSEARCH_ERROR_DOCUMENTS_SOURCE = "Please provide either the 'documents' or the 'vault_id' parameter"
+ELASTICSEARCH_ERROR_VAULT_FILE = "Unable to read the file with vault ID {vault_id}. {error}"
+ELASTICSEARCH_ERROR_BULK_NOTHING_INDEXED = "None of the documents could be indexed"
+ELASTICSEARCH_ERROR_CIRCUIT_OPEN = "The cluster failed repeatedly, not sending any request for the next {seconds} seconds (circuit breaker open)"
+ELASTICSEARCH_ERROR_NO_AGGREGATIONS = "Please provide a query with 'aggs' in the 'query' parameter"
+ELASTICSEARCH_ERROR_VALUE_LIST = "Please provide one of {values} in the '{key}' parameter"
+ELASTICSEARCH_ERROR_NO_NODE_URL = "Please provide at least one node URL in the 'url' asset setting"
+ELASTICSEARCH_ERROR_INGEST_SOURCES = "Please provide a non-empty JSON list of source objects in the 'ingest_sources' asset setting"
+ELASTICSEARCH_ERROR_INGEST_SOURCE = (
+    "Please provide a valid, unique '{key}' for the source at position {position} in the 'ingest_sources' asset setting"
+)
+ELASTICSEARCH_ERROR_INGEST_FAILED_SOURCES = "Ingestion failed for {failed} of {sources} sources: {names}"
+ELASTICSEARCH_ERROR_INVALID_TIME = "Please provide epoch milliseconds or an ISO 8601 date in the '{key}' parameter"
+ELASTICSEARCH_ERROR_TIME_RANGE = "Please provide a 'start_time' before the 'end_time' to search a time range"
+ELASTICSEARCH_ERROR_WINDOW_FAILED = (
+    "{message}. The hits before {completed_until} were returned, run the query again from that start time to resume"
+)
+ELASTICSEARCH_ERROR_TIEBREAKER_REQUIRED = (
+    "Please provide the 'ingest_tiebreaker_field' asset setting, a field unique per document, to poll incrementally on the timestamp field"
+)
+ELASTICSEARCH_ERROR_FIELD_MAP = "Unable to load the ingest field map: {error}"
+ELASTICSEARCH_ERROR_INVALID_INT = "Please provide a valid integer value in the '{key}' parameter"
+ELASTICSEARCH_ERROR_NEGATIVE_INT = "Please provide a valid non-negative integer value in the '{key}' parameter"
+ELASTICSEARCH_ERROR_ZERO_INT = "Please provide a non-zero positive integer value in the '{key}' parameter"
+ELASTICSEARCH_ERROR_MAX_INT = "Please provide a value of at most {max} in the '{key}' parameter"
+ELASTICSEARCH_SAVE_CONTAINERS_PROGRESS = "Saved containers {first} to {last}: {saved} succeeded, {failed} failed"
+ELASTICSEARCH_RETRY_MESSAGE = "Retrying {endpoint} after {reason}, waiting {delay:.1f} seconds"
+ELASTICSEARCH_TIMINGS_MESSAGE = "Phase timings of the '{action}' action"
+ELASTICSEARCH_CONNECTION_STATS = "Connection pool: {requests} requests sent over {connections} connections"
+ELASTICSEARCH_NODE_FAILED_MESSAGE = "Node {url} failed, it gets no requests for the next {seconds} seconds"
+ELASTICSEARCH_SNIFF_MESSAGE = "Discovered {count} nodes of the cluster: {urls}"
+ELASTICSEARCH_SNIFF_FAILED_MESSAGE = "Unable to discover the nodes of the cluster, using the configured URLs. {message}"
 ELASTICSEARCH_DEFAULT_TIMEOUT = 60
+ELASTICSEARCH_DEFAULT_POOL_SIZE = 10
+ELASTICSEARCH_DEFAULT_CONNECT_TIMEOUT = 10
+ELASTICSEARCH_DEFAULT_REQUEST_RETRIES = 3
+ELASTICSEARCH_DEFAULT_RETRY_BUDGET = 10
+ELASTICSEARCH_DEFAULT_BREAKER_THRESHOLD = 5
+ELASTICSEARCH_DEFAULT_BREAKER_COOLDOWN = 60
+ELASTICSEARCH_DEFAULT_DEAD_NODE_TIMEOUT = 60
+ELASTICSEARCH_MAX_DEAD_NODE_TIMEOUT = 3600
+ELASTICSEARCH_DEFAULT_SNIFF_INTERVAL = 0
+ELASTICSEARCH_RETRY_BASE_DELAY = 0.5
+ELASTICSEARCH_RETRY_MAX_DELAY = 30
+ELASTICSEARCH_DEFAULT_PAGE_SIZE = 1000
+ELASTICSEARCH_DEFAULT_MAX_HITS = 10000
+ELASTICSEARCH_DEFAULT_BATCH_SIZE = 100
+ELASTICSEARCH_DEFAULT_SLICES = 4
+ELASTICSEARCH_MAX_EXPORT_SLICES = 128
+ELASTICSEARCH_MAX_EXPORT_WORKERS = 8
+ELASTICSEARCH_DEFAULT_BULK_CHUNK_SIZE = 500
+ELASTICSEARCH_DEFAULT_BULK_CHUNK_BYTES = 5242880
+ELASTICSEARCH_DEFAULT_BULK_MAX_RETRIES = 3
+ELASTICSEARCH_BULK_BACKOFF_BASE = 1
+ELASTICSEARCH_BULK_BACKOFF_MAX = 30
+ELASTICSEARCH_MAX_BULK_ERRORS = 100
+ELASTICSEARCH_READ_BLOCK_SIZE = 65536
+ELASTICSEARCH_DEFAULT_QUEUE_SIZE = 2
+ELASTICSEARCH_DEFAULT_INGEST_CONCURRENCY = 4
+ELASTICSEARCH_DEFAULT_WINDOW_TARGET_HITS = 10000
+ELASTICSEARCH_DEFAULT_WINDOW_CONCURRENCY = 4
+ELASTICSEARCH_WINDOW_QUEUE_SIZE = 1
+ELASTICSEARCH_DEFAULT_GROUP_BUCKET = 0
+ELASTICSEARCH_DEFAULT_GROUP_MAX_ARTIFACTS = 100
+ELASTICSEARCH_MAX_GROUP_COUNTS = 10000
+ELASTICSEARCH_DEFAULT_TIMESTAMP_FIELD = "@timestamp"
+ELASTICSEARCH_QUEUE_POLL_INTERVAL = 1
+ELASTICSEARCH_DEBUG_CAPTURE_BYTES = 1024
+ELASTICSEARCH_DEFAULT_CACHE_TTL = 0
+ELASTICSEARCH_DEFAULT_CACHE_SIZE = 100
+ELASTICSEARCH_CACHE_MAX_ENTRY_BYTES = 1048576
+ELASTICSEARCH_QUERY_CACHE_DIR = "{asset_id}_query_cache"
+ELASTICSEARCH_INDEX_CACHE_DIR = "{asset_id}_index_cache"
+ELASTICSEARCH_NODES_FILE = "{asset_id}_nodes.json"
+ELASTICSEARCH_INDEX_CACHE_SIZE = 10
+ELASTICSEARCH_CAT_INDICES_COLUMNS = ["index", "health", "status", "docs.count", "store.size"]
+ELASTICSEARCH_SORT_ORDERS = ["asc", "desc"]
+ELASTICSEARCH_DEFAULT_DEDUP_HOURS = 0
+ELASTICSEARCH_DEDUP_GENERATIONS = 4
+ELASTICSEARCH_DEDUP_MAX_ENTRIES = 1000000
+ELASTICSEARCH_DEDUP_FILE = "{asset_id}_ingested_hits.json"
+ELASTICSEARCH_OUTPUT_FORMAT_ROWS = "rows"
+ELASTICSEARCH_OUTPUT_FORMAT_COLUMNS = "columns"
+ELASTICSEARCH_OUTPUT_FORMATS = [ELASTICSEARCH_OUTPUT_FORMAT_ROWS, ELASTICSEARCH_OUTPUT_FORMAT_COLUMNS]
+ELASTICSEARCH_DEFAULT_MAX_ROWS = 10000
+ELASTICSEARCH_AGGREGATION_FILTER_PATH = "took,timed_out,aggregations"
+ELASTICSEARCH_BUCKET_KEYS = ["key", "key_as_string", "doc_count", "from", "from_as_string", "to", "to_as_string"]
+ELASTICSEARCH_PIT_KEEP_ALIVE = "1m"
+ELASTICSEARCH_PAGING_FILTER_PATH = ["pit_id", "hits.hits.sort"]
+
+# phases timed for the action summary
+ELASTICSEARCH_PHASE_HTTP_WAIT = "http_wait"
+ELASTICSEARCH_PHASE_HTTP_TRANSFER = "http_transfer"
+ELASTICSEARCH_PHASE_RETRY_WAIT = "retry_wait"
+ELASTICSEARCH_PHASE_SERVER_TOOK = "server_took"
+ELASTICSEARCH_PHASE_JSON_DECODE = "json_decode"
+ELASTICSEARCH_PHASE_CACHE = "cache"
+ELASTICSEARCH_PHASE_QUEUE_WAIT = "queue_wait"
+ELASTICSEARCH_PHASE_PARSE = "parse"
+ELASTICSEARCH_PHASE_SAVE_CONTAINERS = "save_containers"
+
+# widgets
+ELASTICSEARCH_VIEW_PAGE_SIZE = 50
+ELASTICSEARCH_VIEW_MAX_ROWS = 5000
+ELASTICSEARCH_VIEW_SOURCE_CHARS = 300
@@ -0,0 +1,304 @@
+# File: elasticsearch_fields.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Declarative mapping of the nested _source of the hits to flat CEF fields, used by the ingest parsers.
+
+A field map is a JSON object, e.g.
+
+    {
+        "fields": {
+            "source.ip": {"cef": "sourceAddress", "contains": ["ip"]},
+            "event.id": {"cef": "eventId", "type": "integer"},
+            "@timestamp": {"cef": "startTime", "type": "timestamp"},
+            "_index": "deviceCustomString1"
+        },
+        "keep_unmapped": true
+    }
+
+Every key of "fields" is the dotted path of a field in the _source, or one of the hit metadata fields like _id and
+_index. The value is the CEF name, or an object with the CEF name, an optional type to coerce the value to and the
+optional contains hints of the field. With keep_unmapped, the default, the fields which are not mapped are kept
+under their dotted path.
+"""
+
+import datetime
+import hashlib
+import json
+
+
+METADATA_FIELDS = ("_id", "_index", "_routing", "_score")
+
+
+def _to_boolean(value):
+    if isinstance(value, str):
+        if value.lower() in ("true", "1", "yes"):
+            return True
+        if value.lower() in ("false", "0", "no"):
+            return False
+        raise ValueError(value)
+    return bool(value)
+
+
+def _to_timestamp(value):
+    """ISO 8601 form of epoch milliseconds, strings are assumed to be formatted dates already"""
+
+    if isinstance(value, str):
+        return value
+    timestamp = datetime.datetime.fromtimestamp(value / 1000, tz=datetime.timezone.utc)
+    return timestamp.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+COERCIONS = {
+    "string": str,
+    "integer": int,
+    "float": float,
+    "boolean": _to_boolean,
+    "timestamp": _to_timestamp,
+    "json": lambda value: json.dumps(value, sort_keys=True),
+}
+
+
+def _walk(flat, prefix, source):
+    for key, value in source.items():
+        path = prefix + key
+        if type(value) is dict:
+            _walk(flat, path + ".", value)
+        elif type(value) is list and any(type(item) in (dict, list) for item in value):
+            _walk(flat, path + ".", {str(position): item for position, item in enumerate(value)})
+        else:
+            flat[path] = value
+
+
+def flatten(source):
+    """Flatten nested objects into a dict keyed by dotted path, lists of objects are flattened by position"""
+
+    flat = {}
+    _walk(flat, "", source)
+    return flat
+
+
+def _coerce(function, value):
+    try:
+        return [function(item) for item in value] if type(value) is list else function(value)
+    except (TypeError, ValueError, OverflowError):
+        # a value which does not fit the type is kept as it is
+        return value
+
+
+class FieldMap:
+    """A compiled field map, see compile_field_map"""
+
+    def __init__(self, fields=None, keep_unmapped=True, cef_types=None):
+        # dotted path -> (CEF name, coercion function or None)
+        self._fields = fields or {}
+        self._keep_unmapped = keep_unmapped
+        self.cef_types = cef_types or {}
+        self._extract = self._compile()
+
+    def _compile(self):
+        """Generate the function which extracts the mapped fields of one hit.
+
+        Every nested object on the mapped paths is looked up once, the lookups and coercions of all the fields are
+        unrolled into straight line code. Only repr() of the paths and CEF names is part of the generated code.
+        """
+
+        lines = ["def extract(hit, source):", "    cef = {}"]
+        objects = {(): "source"}
+
+        def lookup(keys):
+            if keys not in objects:
+                parent = lookup(keys[:-1])
+                objects[keys] = name = f"object_{len(objects)}"
+                lines.append(f"    {name} = {parent}.get({keys[-1]!r})")
+                lines.append(f"    if type({name}) is not dict:")
+                lines.append(f"        {name} = EMPTY")
+            return objects[keys]
+
+        coercions = []
+        for path, (name, coerce) in self._fields.items():
+            if path in METADATA_FIELDS:
+                lines.append(f"    value = hit.get({path!r})")
+            else:
+                keys = tuple(path.split("."))
+                lines.append(f"    value = {lookup(keys[:-1])}.get({keys[-1]!r})")
+                if len(keys) > 1:
+                    # the source can also hold the dotted name as a key of its own
+                    lines.append("    if value is None:")
+                    lines.append(f"        value = source.get({path!r})")
+            lines.append("    if value is not None:")
+            if coerce is not None:
+                lines.append(f"        value = coerce(coercions[{len(coercions)}], value)")
+                coercions.append(coerce)
+            lines.append(f"        cef[{name!r}] = value")
+        lines.append("    return cef")
+
+        namespace = {"EMPTY": {}, "coerce": _coerce, "coercions": coercions}
+        exec(compile("\n".join(lines), "<field map>", "exec"), namespace)
+        return namespace["extract"]
+
+    def apply(self, hits):
+        """Return the CEF dict of every hit, in one pass over the page"""
+
+        extract = self._extract
+        if not self._keep_unmapped:
+            return [extract(hit, hit.get("_source") or {}) for hit in hits]
+
+        fields = self._fields
+        if not fields:
+            return [flatten(hit.get("_source") or {}) for hit in hits]
+
+        cefs = []
+        for hit in hits:
+            source = hit.get("_source") or {}
+            cef = {path: value for path, value in flatten(source).items() if path not in fields}
+            cef.update(extract(hit, source))
+            cefs.append(cef)
+
+        return cefs
+
+
+class HitGrouper:
+    """Assigns the hits of a poll to containers by the values of the group_by fields and a time bucket.
+
+    Hits with the same values, whose time_field falls in the same bucket of bucket_seconds, share a container until it
+    holds max_artifacts of them, the next hits of the group go to a new container. The containers are identified by
+    a hash of the group, so a group which continues on a later page, or in a later poll, is added to the same
+    container. The saved_counts of the earlier polls, by the identifier of the first container of every group, tell
+    how many hits the containers of a group already hold, record_saved() adds the hits stored by this poll to them.
+    """
+
+    def __init__(self, group_by, bucket_seconds=0, time_field=None, max_artifacts=100, saved_counts=None):
+        self._group_by = list(group_by)
+        self._bucket_ms = bucket_seconds * 1000 if time_field else 0
+        self._time_field = time_field
+        paths = self._group_by + ([time_field] if self._bucket_ms else [])
+        self._fields = FieldMap({path: (path, None) for path in paths}, keep_unmapped=False)
+        self._max_artifacts = max(1, max_artifacts)
+        # number of hits assigned to every group so far, and the identifier and name of every container
+        self._counts = {}
+        self._groups = {}
+        self._saved_counts = saved_counts or {}
+        # the group of every container identifier, and the number of hits of every group stored by this poll
+        self._group_keys = {}
+        self._stored = {}
+
+    def _bucket(self, value):
+        if value is None:
+            return None
+        if not isinstance(value, (int, float)):
+            try:
+                parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            except ValueError:
+                return None
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+            value = parsed.timestamp() * 1000
+        return int(value - value % self._bucket_ms)
+
+    def group(self, hits):
+        """Return the (container identifier, container name) of every hit"""
+
+        groups = []
+        for values in self._fields.apply(hits):
+            key = [values.get(path) for path in self._group_by]
+            if self._bucket_ms:
+                key.append(self._bucket(values.get(self._time_field)))
+            try:
+                group_key = tuple(key)
+                count = self._counts.get(group_key)
+            except TypeError:
+                # a list value cannot be a dict key as it is
+                group_key = json.dumps(key, sort_keys=True, default=str)
+                count = self._counts.get(group_key)
+            if count is None:
+                # a group which an earlier poll started continues after the hits its containers already hold
+                first = self._groups[(group_key, 0)] = self._describe(key, 0)
+                self._group_keys[first[0]] = group_key
+                count = self._saved_counts.get(first[0], 0)
+            self._counts[group_key] = count + 1
+
+            part = count // self._max_artifacts
+            group = self._groups.get((group_key, part))
+            if group is None:
+                group = self._groups[(group_key, part)] = self._describe(key, part)
+                self._group_keys[group[0]] = group_key
+            groups.append(group)
+
+        return groups
+
+    def record_saved(self, container_id, hits):
+        """Count the hits of a container of a group as stored, containers of other parsers are ignored"""
+
+        group_key = self._group_keys.get(container_id)
+        if group_key is not None:
+            self._stored[group_key] = self._stored.get(group_key, 0) + hits
+
+    def counts(self):
+        """The number of hits stored by every group this poll stored hits of, earlier polls included, by its first
+        container"""
+
+        counts = {}
+        for group_key, stored in self._stored.items():
+            first_id = self._groups[(group_key, 0)][0]
+            counts[first_id] = self._saved_counts.get(first_id, 0) + stored
+        return counts
+
+    def _describe(self, key, part):
+        """The (container identifier, container name) of a group"""
+
+        label = ", ".join(f"{path}={'' if value is None else value}" for path, value in zip(self._group_by, key))
+        if self._bucket_ms and key[-1] is not None:
+            label += " at " + _to_timestamp(key[-1])
+        identity = json.dumps(key, sort_keys=True, default=str)
+        if part:
+            identity += f"/{part}"
+            label += f" ({part + 1})"
+
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest(), label
+
+
+def compile_field_map(spec):
+    """Validate a field map, given as a dict or its JSON form, and compile it once for all the hits of a poll.
+
+    Raises ValueError when the field map is not valid.
+    """
+
+    if isinstance(spec, str):
+        spec = json.loads(spec)
+    if not spec:
+        return FieldMap()
+    if not isinstance(spec, dict) or not isinstance(spec.get("fields", {}), dict):
+        raise ValueError("the field map must be an object with a 'fields' object")
+
+    fields = {}
+    cef_types = {}
+    for path, target in spec.get("fields", {}).items():
+        if isinstance(target, str):
+            target = {"cef": target}
+        if not isinstance(target, dict) or not target.get("cef"):
+            raise ValueError(f"the field '{path}' has no CEF name")
+
+        field_type = target.get("type")
+        if field_type is not None and field_type not in COERCIONS:
+            raise ValueError(f"the type of the field '{path}' must be one of {', '.join(COERCIONS)}")
+
+        contains = target.get("contains")
+        if contains:
+            if isinstance(contains, str):
+                contains = [contains]
+            cef_types[target["cef"]] = list(contains)
+
+        fields[path] = (target["cef"], COERCIONS.get(field_type))
+
+    return FieldMap(fields, bool(spec.get("keep_unmapped", True)), cef_types)
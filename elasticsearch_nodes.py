@@ -0,0 +1,203 @@
+# File: elasticsearch_nodes.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""The nodes of the cluster the REST calls are spread over, with their health and latency"""
+
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+ROUND_ROBIN = "round_robin"
+LEAST_LATENCY = "least_latency"
+SELECTORS = [ROUND_ROBIN, LEAST_LATENCY]
+
+# weight of the latest response time in the moving average of the latency of a node
+LATENCY_WEIGHT = 0.3
+
+
+def parse_urls(value):
+    """The node URLs of a comma separated list, without trailing slashes and duplicates"""
+
+    urls = []
+    for url in value.split(","):
+        url = url.strip().rstrip("/")
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def publish_urls(response, scheme):
+    """The URLs of the nodes listed by the _nodes/http API, reached with the scheme of the configured URLs"""
+
+    urls = []
+    for node in (response.get("nodes") or {}).values():
+        address = ((node or {}).get("http") or {}).get("publish_address")
+        if not address:
+            continue
+        # the address is 'host:port', or 'hostname/ip:port' when the node was bound by name
+        host, _, port = address.rpartition(":")
+        hostname, _, ip = host.partition("/")
+        url = f"{scheme}://{hostname or ip}:{port}"
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+class NodePool:
+    """Selects the node of every request among the healthy ones.
+
+    A node which fails is dead for dead_timeout seconds, doubled with every consecutive failure up to
+    max_dead_timeout, and gets requests again once that is over. When every node is dead the one which comes back
+    first is used anyway, so the pool never fails a request by itself. The latency of a node is a moving average of
+    its response times, measured by the current action only. All the methods can be called from the worker threads
+    of an action.
+
+    The failures and the discovered nodes are kept in a JSON file, so the next actions skip the dead nodes too. The
+    file is read by load() and written back by save(), only if the health of the nodes changed.
+    """
+
+    def __init__(self, urls, selector=ROUND_ROBIN, dead_timeout=60, max_dead_timeout=3600, path=None):
+        self._lock = threading.Lock()
+        self._selector = selector
+        self._dead_timeout = dead_timeout
+        self._max_dead_timeout = max(dead_timeout, max_dead_timeout)
+        self._path = path
+        # url -> {"failures": consecutive failures, "dead_until": epoch seconds, "latency": seconds or None}
+        self._nodes = {}
+        self.add(urls)
+        # every action is a new process, a random start keeps the actions making a single request from all
+        # going to the first node
+        self._next = random.randrange(len(self._nodes)) if self._nodes else 0
+        self.sniffed = []
+        self.sniffed_at = 0
+        self._saved = self._snapshot()
+
+    @property
+    def urls(self):
+        return list(self._nodes)
+
+    def add(self, urls):
+        with self._lock:
+            for url in urls:
+                self._nodes.setdefault(url, {"failures": 0, "dead_until": 0, "latency": None})
+
+    def alive(self, now=None):
+        """The URLs of the nodes which are not dead"""
+
+        now = time.time() if now is None else now
+        with self._lock:
+            return [url for url, node in self._nodes.items() if node["dead_until"] <= now]
+
+    def select(self):
+        """The URL of the node to send the next request to"""
+
+        now = time.time()
+        with self._lock:
+            alive = [url for url, node in self._nodes.items() if node["dead_until"] <= now]
+            if not alive:
+                return min(self._nodes, key=lambda url: self._nodes[url]["dead_until"])
+            if self._selector == LEAST_LATENCY:
+                # nodes without a response time yet come first, in random order so every node gets measured
+                untried = [url for url in alive if self._nodes[url]["latency"] is None]
+                if untried:
+                    return random.choice(untried)
+                return min(alive, key=lambda url: self._nodes[url]["latency"])
+            url = alive[self._next % len(alive)]
+            self._next += 1
+            return url
+
+    def mark_success(self, url, seconds):
+        with self._lock:
+            node = self._nodes.get(url)
+            if node is None:
+                return
+            node["failures"] = 0
+            node["dead_until"] = 0
+            latency = node["latency"]
+            node["latency"] = seconds if latency is None else latency + LATENCY_WEIGHT * (seconds - latency)
+
+    def mark_failure(self, url):
+        """Mark the node dead, returns the seconds until it is used again"""
+
+        with self._lock:
+            node = self._nodes.get(url)
+            if node is None:
+                return 0
+            node["failures"] += 1
+            backoff = min(self._max_dead_timeout, self._dead_timeout * 2 ** (node["failures"] - 1))
+            node["dead_until"] = time.time() + backoff
+            return backoff
+
+    def set_sniffed(self, urls):
+        """Add the nodes discovered on the cluster, they are kept for the next actions"""
+
+        self.add(urls)
+        self.sniffed = list(urls)
+        self.sniffed_at = time.time()
+
+    def load(self, sniffed=True):
+        """Read the health of the nodes saved by the earlier actions, and their discovered nodes if sniffed is set"""
+
+        if not self._path or not os.path.exists(self._path):
+            return
+
+        with open(self._path, encoding="utf-8") as nodes_file:
+            saved = json.load(nodes_file)
+        if not isinstance(saved, dict):
+            return
+
+        self.sniffed = [url for url in saved.get("sniffed") or [] if isinstance(url, str)]
+        self.sniffed_at = saved.get("sniffed_at") or 0
+        if sniffed:
+            self.add(self.sniffed)
+        with self._lock:
+            for url, health in (saved.get("health") or {}).items():
+                node = self._nodes.get(url)
+                if node is None or not isinstance(health, dict):
+                    continue
+                node["failures"] = int(health.get("failures") or 0)
+                node["dead_until"] = float(health.get("dead_until") or 0)
+        self._saved = self._snapshot()
+
+    def save(self):
+        """Write the health of the nodes back atomically, if it changed since it was loaded"""
+
+        snapshot = self._snapshot()
+        if not self._path or snapshot == self._saved:
+            return
+
+        directory = os.path.dirname(self._path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as nodes_file:
+                json.dump(snapshot, nodes_file)
+            os.replace(tmp_path, self._path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._saved = snapshot
+
+    def _snapshot(self):
+        """What is saved, the latency is left out as it changes with every request"""
+
+        with self._lock:
+            health = {
+                url: {"failures": node["failures"], "dead_until": node["dead_until"]} for url, node in self._nodes.items() if node["failures"]
+            }
+        return {"sniffed": self.sniffed, "sniffed_at": self.sniffed_at, "health": health}
@@ -12,34 +12,65 @@
 # the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
 # either express or implied. See the License for the specific language governing permissions
 # and limitations under the License.
-def ingest_parser(data):
+def ingest_parser(data, field_map=None, grouper=None):
     results = []
     if not isinstance(data, dict):
         return results
 
     hits = data.get("hits", {}).get("hits", [])
-    for hit in hits:
+    if not hits:
+        return results
+
+    # anything printed to stdout will be added to the phantom debug logs
+    print(f"Found {len(hits)} hits. Building containers")
+
+    # without a field map the nested _source is the CEF as it always was, the field map is opt-in
+    cefs = field_map.apply(hits) if field_map is not None else [hit.get("_source") for hit in hits]
+    if grouper is not None:
+        return _group_hits(hits, cefs, field_map, grouper)
+
+    for hit, cef in zip(hits, cefs):
         container = {}
         artifacts = []
 
-        # anything printed to stdout will be added to the phantom debug logs
-        print("Found hit {}. Building container".format(hit["_id"]))
-
         container["run_automation"] = False
         container["source_data_identifier"] = hit["_id"]
         container["name"] = "Elasticsearch: {} {}".format(hit["_index"], hit["_id"])
 
-        artifacts.append(
-            {
-                # always True since there is only one
-                "run_automation": True,
-                "label": "event",
-                "name": "elasticsearch event",
-                "cef": hit.get("_source"),
-                "source_data_identifier": hit["_id"],
-            }
-        )
+        # always True since there is only one
+        artifacts.append(_artifact(hit, cef, field_map, run_automation=True))
 
         results.append({"container": container, "artifacts": artifacts})
 
     return results
+
+
+def _group_hits(hits, cefs, field_map, grouper):
+    """One container per group of hits, with an artifact per hit"""
+
+    groups = {}
+    for hit, cef, (group_id, label) in zip(hits, cefs, grouper.group(hits)):
+        result = groups.get(group_id)
+        if result is None:
+            container = {"run_automation": False, "source_data_identifier": group_id, "name": f"Elasticsearch: {label}"}
+            result = groups[group_id] = {"container": container, "artifacts": []}
+        result["artifacts"].append(_artifact(hit, cef, field_map, run_automation=False))
+
+    for result in groups.values():
+        # the automation runs once per container, when its last artifact is added
+        result["artifacts"][-1]["run_automation"] = True
+
+    return list(groups.values())
+
+
+def _artifact(hit, cef, field_map, run_automation):
+    artifact = {
+        "run_automation": run_automation,
+        "label": "event",
+        "name": "elasticsearch event",
+        "cef": cef,
+        "source_data_identifier": hit["_id"],
+    }
+    if field_map is not None and field_map.cef_types:
+        artifact["cef_types"] = field_map.cef_types
+    return artifact
@@ -0,0 +1,77 @@
+# File: elasticsearch_timing.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Timing of the phases of an action, reported in the action summary and the debug log"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """Accumulates the wall clock time spent in each named phase of an action.
+
+    One timer is shared by every thread of the action run, e.g. the export workers or the ingest fetcher. When tracing
+    is enabled, every REST call is also recorded on its own, up to max_trace calls.
+    """
+
+    def __init__(self, trace=False, max_trace=10000):
+        self._start = time.perf_counter()
+        self._phases = {}
+        self._trace = [] if trace else None
+        self._max_trace = max_trace
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self):
+        return self._trace is not None
+
+    @property
+    def trace(self):
+        return self._trace
+
+    def add(self, phase, seconds):
+        with self._lock:
+            count, total = self._phases.get(phase, (0, 0.0))
+            self._phases[phase] = (count + 1, total + seconds)
+
+    @contextmanager
+    def phase(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def record(self, call):
+        """Add one REST call to the trace, a no-op unless tracing"""
+
+        if self._trace is None:
+            return
+
+        with self._lock:
+            if len(self._trace) < self._max_trace:
+                self._trace.append(call)
+
+    def summary(self):
+        """Milliseconds spent in every phase, and in the whole action so far under 'total'"""
+
+        with self._lock:
+            timings = {phase: round(total * 1000, 1) for phase, (_, total) in self._phases.items()}
+        timings["total"] = round((time.perf_counter() - self._start) * 1000, 1)
+        return timings
+
+    def counts(self):
+        with self._lock:
+            return {phase: count for phase, (count, _) in self._phases.items()}
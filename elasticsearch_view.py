@@ -12,6 +12,31 @@
 # the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
 # either express or implied. See the License for the specific language governing permissions
 # and limitations under the License.
+import json
+import uuid
+
+from elasticsearch_consts import ELASTICSEARCH_VIEW_MAX_ROWS, ELASTICSEARCH_VIEW_PAGE_SIZE, ELASTICSEARCH_VIEW_SOURCE_CHARS
+
+
+def _json_for_script(value):
+    """Serialize the value for a <script type="application/json"> block, it can never close the block early"""
+
+    return json.dumps(value).replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+
+
+def _page_rows(ctx_result, rows, total_rows):
+    """Put the first page of rows in the context, the next ones up to ELASTICSEARCH_VIEW_MAX_ROWS are handed to the
+    browser as JSON and only turned into table rows when the user asks for them"""
+
+    ctx_result["data"] = rows[:ELASTICSEARCH_VIEW_PAGE_SIZE]
+    ctx_result["total_rows"] = total_rows
+    ctx_result["page_size"] = ELASTICSEARCH_VIEW_PAGE_SIZE
+    ctx_result["widget_id"] = uuid.uuid4().hex
+    ctx_result["more_rows"] = _json_for_script(rows[ELASTICSEARCH_VIEW_PAGE_SIZE:ELASTICSEARCH_VIEW_MAX_ROWS])
+    ctx_result["max_rows"] = ELASTICSEARCH_VIEW_MAX_ROWS
+    ctx_result["hidden_rows"] = max(total_rows - ELASTICSEARCH_VIEW_MAX_ROWS, 0)
+
+
 def get_ctx_result(result):
     ctx_result = {}
     param = result.get_param()
@@ -21,7 +46,7 @@ def get_ctx_result(result):
     ctx_result["param"] = param
 
     if data:
-        ctx_result["data"] = data
+        _page_rows(ctx_result, data, len(data))
 
     if summary:
         ctx_result["summary"] = summary
@@ -29,13 +54,43 @@ def get_ctx_result(result):
     return ctx_result
 
 
-def display_config(provides, all_app_runs, context):
+def get_query_ctx_result(result):
+    """Context of a 'run query' result, the hits of all the pages as rows with a bounded preview of their source"""
+
+    ctx_result = {"param": result.get_param(), "summary": result.get_summary()}
+
+    rows = []
+    total_rows = 0
+    for response in result.get_data():
+        hits = response.get("hits", {}).get("hits", [])
+        total_rows += len(hits)
+        for hit in hits[: max(ELASTICSEARCH_VIEW_MAX_ROWS - len(rows), 0)]:
+            source = json.dumps(hit.get("_source", hit.get("fields", {})))
+            if len(source) > ELASTICSEARCH_VIEW_SOURCE_CHARS:
+                source = source[:ELASTICSEARCH_VIEW_SOURCE_CHARS] + "..."
+            rows.append({"index": hit.get("_index"), "id": hit.get("_id"), "score": hit.get("_score"), "source": source})
+
+    if total_rows:
+        _page_rows(ctx_result, rows, total_rows)
+
+    return ctx_result
+
+
+def _display(all_app_runs, context, ctx_result_func):
     context["results"] = results = []
     for summary, action_results in all_app_runs:
         for result in action_results:
-            ctx_result = get_ctx_result(result)
+            ctx_result = ctx_result_func(result)
             if not ctx_result:
                 continue
             results.append(ctx_result)
-    # print context
+
+
+def display_config(provides, all_app_runs, context):
+    _display(all_app_runs, context, get_ctx_result)
     return "display_config.html"
+
+
+def display_query(provides, all_app_runs, context):
+    _display(all_app_runs, context, get_query_ctx_result)
+    return "display_query.html"
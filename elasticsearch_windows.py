@@ -0,0 +1,88 @@
+# File: elasticsearch_windows.py
+#
+# Copyright (c) 2016-2025 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Adaptive time windows, used to split a search over a wide time range into many small ones"""
+
+import datetime
+
+
+MIN_WINDOW_MS = 1000
+
+
+def parse_time(value):
+    """Epoch milliseconds of a time given as epoch milliseconds or an ISO 8601 date, naive dates are UTC"""
+
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    value = str(value).strip()
+    if value.lstrip("-").isdigit():
+        return int(value)
+
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+class TimeWindowPlanner:
+    """Splits the [start, end) range of epoch milliseconds into consecutive windows of about target_hits hits each.
+
+    The planner proposes a window, the caller counts its hits and reports them with feedback(). A window with more
+    than target_hits hits is shrunk in proportion to the overshoot and proposed again, unless it is already min_size
+    long. After a window with less than half the target the next one is twice as long. The first window spans the
+    whole range, so a range with few hits costs a single count.
+    """
+
+    def __init__(self, start, end, target_hits, min_size=MIN_WINDOW_MS):
+        self.start = start
+        self.end = end
+        self._target_hits = max(1, target_hits)
+        self._min_size = max(1, min_size)
+        self._position = start
+        self._size = max(end - start, self._min_size)
+
+    @property
+    def position(self):
+        """Start of the next window, everything before it was accepted"""
+
+        return self._position
+
+    @property
+    def done(self):
+        return self._position >= self.end
+
+    def propose(self):
+        """The next (start, end) window to count, None once the whole range is covered"""
+
+        if self.done:
+            return None
+        return self._position, min(self._position + self._size, self.end)
+
+    def feedback(self, window, hits):
+        """Report the number of hits of the proposed window, returns True if it is accepted and should be searched"""
+
+        start, end = window
+        span = end - start
+        if hits > self._target_hits and span > self._min_size:
+            # aim at the target assuming the hits are spread evenly, but at least halve the window
+            self._size = max(self._min_size, min(span // 2, span * self._target_hits // hits))
+            return False
+
+        self._position = end
+        if hits < self._target_hits // 2:
+            self._size = span * 2
+        else:
+            self._size = span
+        return True